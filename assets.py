@@ -0,0 +1,71 @@
+import io
+import os
+import atexit
+import tempfile
+import streamlit as st
+from PIL import Image
+
+# Largura máxima (px) de cada imagem: ~2x a largura exibida, para telas de alta densidade.
+DISPLAY_WIDTHS = {
+    "Lavie.png": 1200,   # login, coluna central
+    "Lavie2.png": 600,   # barra lateral
+    "tower.png": 800,    # passos 1-3, coluna da direita
+    "Arc.jpeg": 800,
+    "Burj.jpg": 800,
+}
+DEFAULT_WIDTH = 1460     # limite do próprio st.image
+JPEG_QUALITY = 85
+
+PDF_LOGO = "Lavie.png"
+PDF_LOGO_WIDTH = 420     # 35 mm a ~300 dpi
+
+def _resized(path, width):
+    im = Image.open(path)
+    im.load()
+    if im.width > width:
+        im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+    return im
+
+def _transparent(im):
+    if im.mode in ("RGBA", "LA"): return im.getchannel("A").getextrema()[0] < 255
+    return im.mode == "P" and "transparency" in im.info
+
+@st.cache_resource(show_spinner=False)
+def image(name):
+    """(bytes, formato) da imagem já redimensionada; decodificada uma vez por processo.
+
+    PNG com paleta de 256 cores só quando há transparência de fato (logos), JPEG no resto.
+    Devolve None se o arquivo não existir.
+    """
+    if not os.path.exists(name): return None
+    im = _resized(name, DISPLAY_WIDTHS.get(name, DEFAULT_WIDTH))
+    buf = io.BytesIO()
+    if _transparent(im):
+        im.quantize(256, method=Image.Quantize.FASTOCTREE).save(buf, "PNG", optimize=True)
+        return buf.getvalue(), "PNG"
+    im.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue(), "JPEG"
+
+def show(name, **kwargs):
+    """`st.image` com a variante em cache: os mesmos bytes a cada rerun, sem reprocessar no Streamlit."""
+    asset = image(name)
+    if asset is None: raise FileNotFoundError(name)
+    data, fmt = asset
+    st.image(data, output_format=fmt, **kwargs)
+
+@st.cache_resource(show_spinner=False)
+def pdf_logo():
+    """Caminho do logo do relatório já reduzido (PNG temporário, um por processo); None se não existir."""
+    if not os.path.exists(PDF_LOGO): return None
+    fd, path = tempfile.mkstemp(prefix="logo_", suffix=".png")
+    with os.fdopen(fd, "wb") as f:
+        _resized(PDF_LOGO, PDF_LOGO_WIDTH).save(f, "PNG")
+    atexit.register(os.remove, path)
+    return path
+
+def add_pdf_logo(pdf, x, y, w):
+    """Insere o logo reduzido pelo `pdf.image` normal; devolve False se ele não existir."""
+    path = pdf_logo()
+    if path is None or not os.path.exists(path): return False
+    pdf.image(path, x=x, y=y, w=w)
+    return True
@@ -0,0 +1,39 @@
+"""Bytes por rerun das imagens estáticas e custo do logo em cada PDF.
+
+Compara o arquivo original (o que `st.image(caminho)` recebia, reprocessado pelo Streamlit a cada
+rerun) com a variante em cache de `assets.image`, e o `pdf.image("Lavie.png")` por relatório com
+o logo já reduzido de `assets.add_pdf_logo`.
+
+    python benchmarks/bench_assets.py [n_pdfs]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+from fpdf import FPDF  # noqa: E402
+import assets  # noqa: E402
+
+def logo_pdf(embed):
+    pdf = FPDF()
+    pdf.add_page()
+    embed(pdf)
+    return pdf.output(dest='S')
+
+def timed(fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n): out = fn()
+    return (time.perf_counter() - t0) / n * 1000, len(out)
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name in assets.DISPLAY_WIDTHS:
+        data, fmt = assets.image(name)
+        print(f"{name:12s} {os.path.getsize(name) / 1024:8.1f} KB -> {len(data) / 1024:7.1f} KB {fmt}")
+
+    old_ms, old_size = timed(lambda: logo_pdf(lambda pdf: pdf.image(assets.PDF_LOGO, x=10, y=15, w=35)), n)
+    assets.pdf_logo()  # redimensionamento único, fora da medida
+    new_ms, new_size = timed(lambda: logo_pdf(lambda pdf: assets.add_pdf_logo(pdf, x=10, y=15, w=35)), n)
+    print(f"logo no PDF: {old_ms:8.1f} ms {old_size / 1024:6.1f} KB -> {new_ms:6.1f} ms {new_size / 1024:6.1f} KB (x{old_ms / new_ms:.0f})")
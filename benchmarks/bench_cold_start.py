@@ -0,0 +1,42 @@
+"""Tempo de partida a frio até a tela de login.
+
+Cada rodada sobe um interpretador novo, executa `main.py` pelo `AppTest` do Streamlit sem
+usuário logado e mede o tempo total (imports + primeira renderização). Também lista quais
+módulos pesados foram carregados só para desenhar o login.
+
+    python benchmarks/bench_cold_start.py [rodadas]
+"""
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["plotly", "fpdf", "gspread", "scipy", "statsmodels", "ui_components", "export"]
+
+CHILD = """
+import sys, time, json
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file({main!r}, default_timeout=120)
+at.secrets['credentials'] = {{'ana': 'x'}}
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({{'streamlit': t1 - t0, 'login': t2 - t1,
+                  'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def cold_start():
+    env = dict(os.environ, SIMULADOR_STORAGE="sqlite", PYTHONWARNINGS="ignore")
+    code = CHILD.format(main=os.path.join(ROOT, "main.py"), heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    runs = [cold_start() for _ in range(rounds)]
+    login = sorted(r['login'] for r in runs)
+    print(f"import streamlit: {min(r['streamlit'] for r in runs) * 1000:8.0f} ms (melhor de {rounds})")
+    print(f"main.py até login: {login[0] * 1000:8.0f} ms melhor | {login[len(login) // 2] * 1000:8.0f} ms mediana")
+    print(f"módulos pesados carregados: {', '.join(runs[-1]['loaded']) or 'nenhum'}")
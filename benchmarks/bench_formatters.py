@@ -0,0 +1,56 @@
+"""Microbenchmark dos formatadores de moeda, percentual e data.
+
+Compara a formatação valor a valor usada antes (`.apply` com `locale.currency`, f-string e
+`strftime`) com `utils.format_brl`, `utils.format_percent` e `utils.format_date` sobre a coluna
+inteira. Sem o locale pt_BR instalado, o formato antigo é emulado com `format()` por valor.
+
+    python benchmarks/bench_formatters.py [n_linhas]
+"""
+import os
+import sys
+import time
+import locale
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils  # noqa: E402
+
+try:
+    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+    HAS_PT_BR = True
+except locale.Error:
+    HAS_PT_BR = False
+
+_SWAP = str.maketrans(',.', '.,')
+
+def old_currency(value):
+    if HAS_PT_BR:
+        return locale.currency(float(value), grouping=True, symbol='R$')
+    text = f"{abs(value):,.2f}".translate(_SWAP)
+    return f"-R$ {text}" if value < 0 and text != "0,00" else f"R$ {text}"
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(0)
+    money = pd.Series(rng.normal(0, 2e6, n))
+    pct = pd.Series(rng.normal(15, 10, n))
+    dates = pd.Series(pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 3650, n), unit='D'))
+
+    mismatches = int((utils.format_brl(money) != money.apply(old_currency)).sum())
+    print(f"{n} linhas | locale pt_BR: {'sim' if HAS_PT_BR else 'não (formato emulado)'} | divergências BRL: {mismatches}")
+    cases = [
+        ("moeda", lambda: money.apply(old_currency), lambda: utils.format_brl(money)),
+        ("percentual", lambda: pct.apply(lambda x: f"{x:.2f}%"), lambda: utils.format_percent(pct)),
+        ("data", lambda: dates.apply(lambda d: d.strftime('%d/%m/%Y')), lambda: utils.format_date(dates)),
+    ]
+    for name, old, new in cases:
+        old_ms, new_ms = timed(old), timed(new)
+        print(f"  {name:10} por valor {old_ms:8.1f} ms | coluna {new_ms:7.1f} ms | {old_ms / new_ms:5.1f}x")
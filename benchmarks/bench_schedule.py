@@ -0,0 +1,76 @@
+"""Benchmark da composição do cronograma de aportes em calculate_financials.
+
+Compara o laço original (um `_ensure_date` e um `**` por aporte) com a versão em arrays
+NumPy para cronogramas de 10 a 100 mil parcelas.
+
+    python benchmarks/bench_schedule.py
+"""
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils  # noqa: E402
+
+SIZES = [10, 100, 1_000, 10_000, 100_000]
+END_DATE = date(2035, 12, 31)
+RATE = 12.0
+
+
+def make_schedule(n, seed=0):
+    rng = np.random.default_rng(seed)
+    offsets = rng.integers(0, 3650, size=n)
+    values = rng.uniform(1_000, 100_000, size=n)
+    start = np.datetime64('2025-01-01', 'D')
+    return [{'date': (start + int(o)).astype(object), 'value': float(v)} for o, v in zip(offsets, values)]
+
+
+def loop_schedule_stage(aportes, dt_end, annual_interest_rate):
+    """Implementação anterior (laço por aporte), mantida apenas para comparação."""
+    daily_rate = (1 + annual_interest_rate / 100) ** (1/365) - 1
+    sorted_aps = sorted(aportes, key=lambda x: utils._ensure_date(x.get('date', x.get('data'))))
+    dt_first_ap = utils._ensure_date(sorted_aps[0].get('date', sorted_aps[0].get('data')))
+    rd = relativedelta(dt_end, dt_first_ap)
+    total_contribution = 0
+    total_montante = 0
+    for ap in sorted_aps:
+        dt_ap = utils._ensure_date(ap.get('date', ap.get('data')))
+        val = float(ap.get('value', ap.get('valor', 0)))
+        total_contribution += val
+        days_active = (dt_end - dt_ap).days
+        total_montante += val * ((1 + daily_rate) ** days_active) if days_active > 0 else val
+    return total_contribution, total_montante, rd
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    print(f"{'parcelas':>10} {'laço (ms)':>12} {'arrays (ms)':>12} {'só composição (ms)':>20} {'ganho':>8}")
+    for n in SIZES:
+        aportes = make_schedule(n)
+        repeat = 5 if n <= 10_000 else 2
+        t_loop = best_of(lambda: loop_schedule_stage(aportes, END_DATE, RATE), repeat)
+        t_vec = best_of(lambda: utils._schedule_stage(aportes, END_DATE, RATE), repeat)
+        arrays = utils._schedule_arrays(aportes)
+        t_comp = best_of(lambda: utils._schedule_stage(arrays, END_DATE, RATE), repeat)
+
+        ref = loop_schedule_stage(aportes, END_DATE, RATE)[1]
+        got = utils._schedule_stage(arrays, END_DATE, RATE)['valor_corrigido']
+        assert abs(ref - got) <= 1e-9 * abs(ref), (ref, got)
+
+        print(f"{n:>10} {t_loop * 1e3:>12.2f} {t_vec * 1e3:>12.2f} {t_comp * 1e3:>20.3f} {t_loop / t_comp:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
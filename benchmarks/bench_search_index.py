@@ -0,0 +1,48 @@
+"""Busca do histórico: filtro str.contains + sort a cada rerun vs SearchIndex pré-construído.
+
+Uso: python benchmarks/bench_search_index.py [n_simulacoes]
+"""
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from storage import SearchIndex
+
+FIRST = ['João', 'Maria', 'José', 'Ana', 'Conceição', 'Antônio', 'Luís', 'Fátima', 'Sérgio', 'Márcia']
+LAST = ['Ávila', 'Araújo', 'Gonçalves', 'Magalhães', 'Simões', 'Lima', 'Souza', 'Brandão', 'Estêvão', 'Peçanha']
+
+def make_simulations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'simulation_id': [f"sim_{i}" for i in range(n)],
+        'created_at': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365 * 86400, n), unit='s'),
+        'client_name': [f"{FIRST[a]} {LAST[b]} {i}" for i, (a, b) in enumerate(zip(rng.integers(0, 10, n), rng.integers(0, 10, n)))],
+        'client_code': [f"C{i:06d}" for i in range(n)],
+        'user_name': rng.choice(['ana', 'bruno', 'carla'], n),
+    })
+
+def old_search(df, query):
+    if query:
+        df = df[df['client_name'].str.lower().str.contains(query.lower(), na=False)]
+    return df.sort_values('created_at', ascending=False)
+
+def timed(fn, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = make_simulations(n)
+    t0 = time.perf_counter()
+    index = SearchIndex(df)
+    index.order('created_at', True)
+    print(f"{n} simulações | construção do índice: {(time.perf_counter() - t0) * 1000:.0f} ms ({len(index.tokens)} tokens)")
+    for query in ['', 'joao', 'conceicao ara', 'C00012', 'bruno fat']:
+        old_ms = timed(lambda: old_search(df, query), repeat=5)
+        new_ms = timed(lambda: index.search(query, 'created_at', True))
+        print(f"  {query!r:18} antigo {old_ms:8.2f} ms | índice {new_ms:7.3f} ms | {len(index.search(query))} resultados")
@@ -0,0 +1,81 @@
+"""Benchmark da conversão dos dados da planilha (read_sheet_frame).
+
+Gera uma aba `simulations` sintética com valores formatados como o Google Sheets devolve
+em pt-BR ("R$ 1.234,56", "17/10/2026 10:00:00") e compara a cadeia antiga de
+`str.replace`/`to_numeric` por coluna com `utils.parse_sheet_frame`.
+
+    python benchmarks/bench_sheet_parser.py [linhas]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils  # noqa: E402
+
+DEFAULT_ROWS = 100_000
+
+
+def br_number(values, currency=False):
+    s = pd.Series(values).map(lambda v: f"{v:,.2f}").str.replace(',', '_').str.replace('.', ',').str.replace('_', '.')
+    return ("R$ " + s) if currency else s
+
+
+def make_sheet(n, seed=0):
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 3 * 365 * 86400, n), unit='s')
+    df = pd.DataFrame({'simulation_id': [f"sim_{i}" for i in range(n)],
+                       'created_at': created.strftime('%d/%m/%Y %H:%M:%S'),
+                       'client_name': [f"Cliente {i}" for i in range(n)]})
+    for c in utils.NUMERIC_COLUMNS:
+        df[c] = br_number(rng.uniform(0, 5e6, n), currency=c in ('vgv', 'valor_corrigido', 'total_contribution'))
+    df['start_date'] = (created - pd.Timedelta(days=30)).strftime('%Y-%m-%d')
+    df['project_end_date'] = (created + pd.Timedelta(days=700)).strftime('%d/%m/%Y')
+    return df.astype(str)
+
+
+def old_parse(df):
+    """Cadeia anterior, coluna a coluna; datas permanecem texto."""
+    for c in utils.NUMERIC_COLUMNS:
+        if c in df.columns:
+            s = df[c].astype(str).str.replace('R$', '', regex=False).str.strip()
+            is_br = s.str.contains(',', na=False)
+            s.loc[is_br] = s.loc[is_br].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+            df[c] = pd.to_numeric(s, errors='coerce').fillna(0)
+    return df
+
+
+def timed(fn, df, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        frame = df.copy()
+        t0 = time.perf_counter()
+        out = fn(frame)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    sheet = make_sheet(n)
+    t_old, old = timed(old_parse, sheet)
+    t_new, new = timed(utils.parse_sheet_frame, sheet)
+    scalar_rows = min(n, 5_000)
+    t0 = time.perf_counter()
+    [utils._ensure_date(v) for v in sheet['project_end_date'].iloc[:scalar_rows]]
+    t_scalar_dates = (time.perf_counter() - t0) * n / scalar_rows
+
+    assert np.allclose(old['vgv'], new['vgv'])
+    assert new['created_at'].notna().all() and new['project_end_date'].notna().all()
+
+    print(f"linhas: {n:,}  colunas numéricas: {len(utils.NUMERIC_COLUMNS)}  colunas de data: 3")
+    print(f"cadeia antiga (só números)          {t_old * 1e3:9.1f} ms")
+    print(f"parse_sheet_frame (números + datas) {t_new * 1e3:9.1f} ms")
+    print(f"_ensure_date escalar, 1 coluna (est.) {t_scalar_dates * 1e3:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
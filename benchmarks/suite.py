@@ -0,0 +1,202 @@
+"""Suíte de benchmarks dos caminhos quentes, comparada com uma linha de base gravada.
+
+Casos (todos com dados sintéticos, sem rede nem credenciais do Google):
+  - calculate_financials com cronogramas de 1 a 100 mil parcelas;
+  - parse_sheet_frame e read_sheet_frame (espelho local em diretório temporário) de 100 a 200 mil linhas;
+  - relatório completo (calculate_financials + generate_pdf);
+  - format_currency valor a valor e format_brl na coluna inteira.
+
+Cada caso informa latência mínima e p50/p95/p99 e vazão (itens/s). Com `--save` os resultados
+viram a linha de base (`benchmarks/baseline.json`); sem ele, o melhor tempo de cada caso é comparado
+com o da base e o script sai com código 1 se algum passar do limite (`--threshold`, padrão 1.5;
+limites por caso podem ficar em `thresholds` no JSON). Junto de cada caso roda uma carga fixa de
+calibração e a comparação usa o tempo relativo a ela, o que absorve boa parte do ruído de máquinas
+compartilhadas. A base vale para a máquina em que foi gravada.
+
+    python benchmarks/suite.py [--quick] [--only TEXTO] [--save] [--threshold 1.3]
+"""
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import date
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+os.environ["SIMULADOR_DATA_DIR"] = tempfile.mkdtemp(prefix="bench_")  # espelho da planilha descartável
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+os.chdir(ROOT)
+import utils  # noqa: E402
+from bench_schedule import make_schedule  # noqa: E402
+from bench_sheet_parser import make_sheet  # noqa: E402
+
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+DEFAULT_THRESHOLD = 1.5
+
+SCHEDULE_SIZES = [1, 100, 10_000, 100_000]
+SHEET_SIZES = [100, 10_000, 200_000]
+QUICK_SCHEDULE_SIZES = [1, 100, 10_000]
+QUICK_SHEET_SIZES = [100, 10_000]
+CURRENCY_VALUES = 200_000
+
+BASE_INPUTS = dict(land_size=1000, construction_cost_m2=3000.0, value_m2=8000.0, area_exchange_percentage=10.0,
+                   annual_interest_rate=12.0, spe_percentage=10.0, client_name="Cliente Benchmark",
+                   client_code="B001", start_date=date(2025, 1, 1), project_end_date=date(2035, 12, 31))
+
+
+class SyntheticSheet:
+    """Aba em memória com a interface que o espelho usa (`get_all_values`, `col_values`)."""
+
+    def __init__(self, frame, name):
+        self.vals = [list(frame.columns)] + frame.values.tolist()
+        self.title, self.id = name, name
+
+        class Book: id = "benchmark"
+        self.spreadsheet = Book()
+
+    def get_all_values(self, range_name=None):
+        if range_name is None: return self.vals
+        first, last = range_name.split(":")
+        return self.vals[int(first[1:]) - 1:int("".join(c for c in last if c.isdigit()))]
+
+    def col_values(self, col):
+        return [r[col - 1] for r in self.vals]
+
+
+def measure(fn, min_runs=7, max_runs=200, budget=2.0, min_sample_ms=20):
+    """Latências (ms por chamada) de `fn`: até `max_runs` amostras ou `budget` segundos (mínimo `min_runs`).
+
+    Chamadas muito curtas são agrupadas (como no `timeit`) até cada amostra passar de `min_sample_ms`,
+    e o coletor de lixo fica desligado durante a medida.
+    """
+    fn()  # aquecimento: caches, imports tardios
+    t0 = time.perf_counter()
+    fn()
+    once = (time.perf_counter() - t0) * 1000
+    inner = max(1, int(min_sample_ms / once)) if once else 1000
+    times = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        while len(times) < max_runs and (len(times) < min_runs or time.perf_counter() - start < budget):
+            t0 = time.perf_counter()
+            for _ in range(inner): fn()
+            times.append((time.perf_counter() - t0) * 1000 / inner)
+    finally:
+        if gc_was_enabled: gc.enable()
+    return np.array(times)
+
+
+def calibration():
+    """Carga fixa (NumPy + Python puro) que mede a velocidade da máquina neste momento."""
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=200_000)
+
+    def work():
+        np.sort(values)
+        sum(int(v * 100) % 7 for v in values[:50_000])
+    return float(measure(work, min_runs=5, budget=0.2).min())
+
+
+def summarize(times, items):
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {"runs": len(times), "items": items, "min_ms": round(float(times.min()), 3), "p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3), "items_per_s": round(items / (p50 / 1000), 1) if p50 else None}
+
+
+def uncached(fn, *args):
+    """Chama `fn` com os caches de cronograma vazios: mede a composição inteira, não só o hash da chave."""
+    utils._cached_schedule_arrays.cache_clear()
+    utils._cached_schedule_stage.cache_clear()
+    return fn(*args)
+
+
+def cases(quick):
+    """(nome, função, itens por execução) — montados sob demanda para não gerar fixtures à toa."""
+    for n in (QUICK_SCHEDULE_SIZES if quick else SCHEDULE_SIZES):
+        data = dict(BASE_INPUTS, aportes=make_schedule(n))
+        yield f"calculate_financials/{n}", lambda data=data: uncached(utils.calculate_financials, data), n
+
+    for n in (QUICK_SHEET_SIZES if quick else SHEET_SIZES):
+        sheet = make_sheet(n)
+        yield f"parse_sheet_frame/{n}", lambda sheet=sheet: utils.parse_sheet_frame(sheet.copy()), n
+        worksheet = SyntheticSheet(sheet, f"simulations_{n}")
+        utils.read_sheet_frame(worksheet, worksheet.title)  # primeira sincronização completa fica fora da medida
+        yield f"read_sheet_frame/{n}", lambda ws=worksheet: utils.read_sheet_frame(ws, ws.title), n
+
+    report = dict(BASE_INPUTS, aportes=make_schedule(24))
+    yield "report_pdf/1", lambda: utils.generate_pdf(uncached(utils.calculate_financials, report)), 1
+
+    money = np.random.default_rng(0).normal(0, 2e6, CURRENCY_VALUES)
+    scalar = money[:2_000].tolist()
+    yield f"format_currency/{len(scalar)}", lambda: [utils.format_currency(v) for v in scalar], len(scalar)
+    yield f"format_brl/{len(money)}", lambda: utils.format_brl(money), len(money)
+
+
+def relative(r):
+    return r["min_ms"] / r["calibration_ms"]
+
+
+def compare(results, baseline, threshold):
+    """Imprime o relatório e devolve os casos acima do limite em relação à base."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get("results", {}).get(name)
+        ratio = relative(r) / relative(base) if base and base.get("calibration_ms") else None
+        limit = baseline.get("thresholds", {}).get(name, threshold)
+        status = "" if ratio is None else ("REGRESSÃO" if ratio > limit else "ok")
+        if status == "REGRESSÃO": regressions.append(name)
+        vs = f"{ratio:6.2f}x" if ratio is not None else "   novo"
+        print(f"{name:28} min {r['min_ms']:10.3f} ms  p50 {r['p50_ms']:10.3f}  p95 {r['p95_ms']:10.3f}  "
+              f"p99 {r['p99_ms']:10.3f}  {r['items_per_s'] or 0:14,.0f} itens/s  {vs} {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="tamanhos menores (sem 100k parcelas / 200k linhas)")
+    parser.add_argument("--only", default="", help="roda só os casos cujo nome contém este texto")
+    parser.add_argument("--save", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="razão tolerada entre o melhor tempo atual e o da base")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f: baseline = json.load(f)
+
+    results = {}
+    for name, fn, items in cases(args.quick):
+        if args.only and args.only not in name: continue
+        calib = calibration()
+        times = measure(fn)
+        results[name] = dict(summarize(times, items), calibration_ms=round(min(calib, calibration()), 3))
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        merged = dict(baseline.get("results", {}), **results)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": {"python": platform.python_version(), "platform": platform.platform(),
+                                   "processor": platform.processor() or platform.machine()},
+                       "thresholds": baseline.get("thresholds", {}), "results": merged}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"linha de base gravada em {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} caso(s) acima do limite: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
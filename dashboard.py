@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import utils
+
+ROI_BINS = 10
+TOP_N = 5
+
+WEBGL_THRESHOLD = 1_000      # acima disto a dispersão usa Scattergl (WebGL) em vez de SVG
+DENSITY_THRESHOLD = 20_000   # acima disto a dispersão vira mapa de densidade + amostra de pontos
+DENSITY_BINS = 80
+DENSITY_SAMPLE = 1_000       # pontos com hover mantidos no modo densidade (extremos + aleatórios)
+SERIES_MAX_POINTS = 500      # VGV acumulado: reduzido por LTTB acima disto
+
+def lttb(x, y, n_out):
+    """Índices escolhidos por Largest-Triangle-Three-Buckets: mantém a forma visível da série.
+
+    O primeiro e o último ponto são mantidos; de cada balde intermediário fica o ponto que forma
+    o maior triângulo com o ponto anterior escolhido e a média do balde seguinte.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3: return np.arange(n)
+    xf, yf = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = xf[nlo:nhi].mean(), yf[nlo:nhi].mean()
+        area = np.abs((xf[a] - avg_x) * (yf[lo:hi] - yf[a]) - (xf[a] - xf[lo:hi]) * (avg_y - yf[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+def _scatter_summary(invested, roi, profit, names):
+    """Dados da dispersão: todos os pontos, ou (acima de DENSITY_THRESHOLD) densidade 2D + amostra."""
+    size = np.abs(np.nan_to_num(profit))
+    ok = np.isfinite(invested) & np.isfinite(roi)
+    if ok.sum() <= DENSITY_THRESHOLD:
+        return {'mode': 'points', 'x': invested, 'y': roi, 'size': size, 'names': names}
+    xi, yi = invested[ok], roi[ok]
+    counts, x_edges, y_edges = np.histogram2d(xi, yi, bins=DENSITY_BINS)
+    rows = np.flatnonzero(ok)
+    order = np.argsort(yi, kind='stable')
+    k = DENSITY_SAMPLE // 4
+    rest = np.setdiff1d(np.arange(len(yi)), np.r_[order[:k], order[-k:]])
+    rng = np.random.default_rng(0)
+    keep = rows[np.r_[order[:k], order[-k:], rng.choice(rest, min(len(rest), DENSITY_SAMPLE - 2 * k), replace=False)]]
+    return {'mode': 'density', 'counts': counts.T, 'x_edges': x_edges, 'y_edges': y_edges,
+            'x': invested[keep], 'y': roi[keep], 'size': size[keep], 'names': names[keep]}
+
+def _numeric(df, col):
+    if col not in df.columns: return np.zeros(len(df))
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+def summarize_portfolio(df, bins=ROI_BINS, top_n=TOP_N):
+    """Resumo materializado do dashboard: KPIs, histograma de ROI, VGV acumulado por dia e top-N.
+
+    Calculado uma vez por versão dos dados (ver `StorageBackend.dashboard_summary`); a página só
+    desenha estas estruturas pequenas.
+    """
+    vgv = _numeric(df, 'vgv')
+    roi = _numeric(df, 'roi_anualizado')
+    invested = _numeric(df, 'total_contribution')
+    profit = _numeric(df, 'resultado_final_investidor')
+    finite_roi = roi[np.isfinite(roi)]
+
+    counts, edges = np.histogram(finite_roi, bins=bins) if len(finite_roi) else (np.array([], dtype=int), np.array([]))
+
+    # Um ponto por dia (não por simulação): a série não cresce com o número de simulações.
+    created = pd.to_datetime(df['created_at'], errors='coerce') if 'created_at' in df.columns else pd.Series(pd.NaT, index=df.index)
+    dated = created.notna().to_numpy()
+    daily = pd.Series(np.nan_to_num(vgv[dated]), index=created[dated].dt.normalize().to_numpy()).groupby(level=0).sum()
+    cumulative = daily.cumsum()
+    keep = lttb(cumulative.index.to_numpy(dtype='datetime64[ns]').astype(np.int64), cumulative.to_numpy(), SERIES_MAX_POINTS)
+    cumulative = cumulative.iloc[keep]
+
+    top = df.assign(_roi=roi).nlargest(top_n, '_roi')
+    top_table = pd.DataFrame({
+        'Cliente': top['client_name'].fillna('') if 'client_name' in top.columns else '',
+        'ROI': utils.format_percent(top['_roi']),
+        'Lucro': utils.format_brl(top['resultado_final_investidor']) if 'resultado_final_investidor' in top.columns else '',
+    })
+
+    return {
+        'n': len(df),
+        'total_vgv': float(np.nansum(vgv)),
+        'total_investido': float(np.nansum(invested)),
+        'lucro_total': float(np.nansum(profit)),
+        'avg_roi': float(finite_roi.mean()) if len(finite_roi) else 0.0,
+        'roi_hist': {'counts': counts, 'edges': edges},
+        'vgv_acumulado': {'dates': cumulative.index.to_numpy(), 'values': cumulative.to_numpy()},
+        'top': top_table,
+        'scatter': _scatter_summary(invested, roi, profit,
+                                    df['client_name'].fillna('').to_numpy(dtype=object) if 'client_name' in df.columns else np.full(len(df), '', dtype=object)),
+    }
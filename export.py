@@ -0,0 +1,74 @@
+import os
+import glob
+import time
+import zipfile
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import utils
+
+ZIP_PREFIX = "relatorios_"
+STALE_ZIP_SECONDS = 60 * 60   # ZIPs não baixados (sessão encerrada) são apagados depois disso
+
+def report_payloads(df_simulations, aportes_index):
+    """Dados de cada relatório: linha da simulação + cronograma vindo do índice agrupado de aportes."""
+    for row in df_simulations.to_dict('records'):
+        row['aportes'] = aportes_index.schedule(row['simulation_id'])
+        yield row
+
+def report_file_name(data):
+    client = "".join(c for c in str(data.get('client_name') or 'simulacao') if c.isalnum() or c in (' ', '_'))
+    return f"relatorio_{client.rstrip().replace(' ', '_').lower()}_{data.get('simulation_id', '')}.pdf"
+
+def _render(data):
+    """Roda no processo filho: recalcula os resultados e gera o PDF."""
+    res = utils.calculate_financials(data)
+    return report_file_name(data), utils.generate_pdf(res)
+
+def export_zip(payloads, total, workers=None, progress=None):
+    """Gera os PDFs num pool de processos e grava cada um no ZIP assim que fica pronto.
+
+    No máximo `2 * workers` relatórios ficam em memória ao mesmo tempo; o ZIP vai para um
+    arquivo temporário, cujo caminho é devolvido. `progress(feitos, total)` é chamado a cada PDF.
+    """
+    workers = workers or os.cpu_count() or 1
+    remove_stale_zips()
+    fd, path = tempfile.mkstemp(prefix=ZIP_PREFIX, suffix=".zip")
+    os.close(fd)
+    done = 0
+
+    def write(zf, result):
+        nonlocal done
+        name, pdf_bytes = result
+        if pdf_bytes: zf.writestr(name, pdf_bytes)
+        done += 1
+        if progress: progress(done, total)
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        if workers <= 1 or total <= 1:
+            for data in payloads: write(zf, _render(data))
+            return path
+        # spawn: o fork herdaria as threads do Streamlit e da fila de gravação no meio de um lock.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pending = set()
+            for data in payloads:
+                pending.add(pool.submit(_render, data))
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in finished: write(zf, f.result())
+            for f in wait(pending).done: write(zf, f.result())
+    return path
+
+def take_zip(path):
+    """Conteúdo do ZIP para o download; o arquivo temporário é apagado em seguida."""
+    with open(path, 'rb') as f: data = f.read()
+    os.remove(path)
+    return data
+
+def remove_stale_zips(max_age=STALE_ZIP_SECONDS):
+    """Apaga ZIPs de exportações antigas que nunca foram baixados."""
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{ZIP_PREFIX}*.zip")):
+        try:
+            if os.path.getmtime(path) < cutoff: os.remove(path)
+        except OSError: pass
@@ -1,11 +1,17 @@
 import streamlit as st
 import pandas as pd
+import os
+import time
+import uuid
 from datetime import datetime
 from streamlit_option_menu import option_menu
 from dateutil.relativedelta import relativedelta 
 import utils
-from ui_components import display_full_results
-import plotly.express as px
+import assets
+import storage
+import dashboard
+import write_queue
+import perf
 import numpy as np
 
 def safe_date_to_string(date_val, fmt='%Y-%m-%d'):
@@ -14,6 +20,7 @@ def safe_date_to_string(date_val, fmt='%Y-%m-%d'):
     except (ValueError, TypeError): return ""  
 
 st.set_page_config(page_title="Simulador Financeiro", page_icon="Lavie1.png", layout="wide")
+_rerun_started = time.perf_counter()
 
 APP_STYLE_CSS = """
 <style>
@@ -71,7 +78,8 @@ if 'parcelado_total_valor' not in st.session_state: st.session_state.parcelado_t
 if 'parcelado_num_parcelas' not in st.session_state: st.session_state.parcelado_num_parcelas = 1
 if 'parcelado_data_inicio' not in st.session_state: st.session_state.parcelado_data_inicio = datetime.today().date()
 
-worksheets = utils.init_gsheet_connection()
+# Conexão com o armazenamento só depois do login (ver o fim do arquivo): a tela de login não paga gspread.
+backend = save_queue = None
 
 def manual_reset():
     """Reseta formulário mantendo a navegação."""
@@ -84,10 +92,11 @@ def safe_date_to_string(date_val, fmt='%d/%m/%Y'):
     try: return pd.to_datetime(date_val).strftime(fmt)
     except: return ""
 
+@perf.timed("page.login")
 def render_login_page():
     c1, c2, c3 = st.columns([1, 2, 1]) 
     with c2:
-        st.image("Lavie.png", use_column_width=True) 
+        assets.show("Lavie.png", use_container_width=True) 
         st.markdown("<h2 style='text-align: center;'>Simulador Financeiro</h2>", unsafe_allow_html=True)
         st.markdown("---")
         try: user_list = list(st.secrets["credentials"].keys())
@@ -105,6 +114,7 @@ def render_login_page():
                 else: st.error("Senha incorreta.")
             else: st.warning("Preencha todos os campos.")
 
+@perf.timed("page.nova_simulacao")
 def render_new_simulation_page():
     
 
@@ -119,6 +129,7 @@ def render_new_simulation_page():
             st.rerun()
 
         if st.session_state.get('results_ready', False):
+            from ui_components import display_full_results  # plotly só quando há resultado para desenhar
             display_full_results(
                 st.session_state.simulation_results,
                 show_save_button=True, 
@@ -126,6 +137,7 @@ def render_new_simulation_page():
                 save_callback=save_simulation_callback,
                 is_simulation_saved=st.session_state.get('simulation_saved', False)
             )
+            render_save_status()
         return
 
     col_form, col_visual = st.columns([2, 1], gap="large")
@@ -240,10 +252,8 @@ def render_new_simulation_page():
                     if 'date' in df_show.columns: df_show.rename(columns={'date':'data', 'value':'valor'}, inplace=True)
                     
                     edited = st.data_editor(df_show, num_rows="dynamic", key="editor_aportes")
-                    recs = []
-                    for r in edited.to_dict('records'):
-                         recs.append({'data': utils._ensure_date(r['data']), 'valor': float(r['valor'])})
-                    st.session_state.aportes = recs
+                    dates = utils.ensure_dates(edited['data']).tolist()
+                    st.session_state.aportes = [{'data': d, 'valor': float(v)} for d, v in zip(dates, edited['valor'])]
 
                 if st.button("Limpar Lista"): 
                     st.session_state.aportes = []
@@ -271,9 +281,10 @@ def render_new_simulation_page():
                                 'area_exchange_percentage': st.session_state.area_exchange_percentage,
                                 'start_date': utils._ensure_date(st.session_state.start_date),
                                 'project_end_date': utils._ensure_date(st.session_state.project_end_date),
-                                'aportes': [{'date': utils._ensure_date(x.get('data')), 'value': x.get('valor')} for x in st.session_state.aportes]
+                                'aportes': [{'date': d, 'value': x.get('valor')} for d, x in zip(
+                                    utils.ensure_dates([x.get('data') for x in st.session_state.aportes]).tolist(), st.session_state.aportes)]
                             }
-                            st.session_state.simulation_results = utils.calculate_financials(p)
+                            st.session_state.simulation_results = utils.calculate_financials_cached(p)
                             st.session_state.simulation_results['simulation_id'] = f"gen_{int(datetime.now().timestamp())}"
                             st.session_state.results_ready = True
                             st.session_state.show_results_page = True
@@ -286,11 +297,11 @@ def render_new_simulation_page():
             step = st.session_state.current_step
             try:
                 if step == 1:
-                    st.image("tower.png", use_container_width=True, caption="Parâmetros da Obra")
+                    assets.show("tower.png", use_container_width=True, caption="Parâmetros da Obra")
                 elif step == 2:
-                    st.image("Arc.jpeg", use_container_width=True, caption="Identidade do Investidor")
+                    assets.show("Arc.jpeg", use_container_width=True, caption="Identidade do Investidor")
                 elif step == 3:
-                    st.image("Burj.jpg", use_container_width=True, caption="Projeção de Crescimento")
+                    assets.show("Burj.jpg", use_container_width=True, caption="Projeção de Crescimento")
             except Exception:
                 st.info("Imagem ilustrativa não encontrada.")
 
@@ -315,80 +326,163 @@ def render_new_simulation_page():
                 st.caption("Preencha os dados para ver os cálculos.")
 
 def save_simulation_callback():
-    if not worksheets: return
+    if not backend: return
     res = st.session_state.simulation_results
-    sim_id = f"sim_{int(datetime.now().timestamp())}"
+    # Sufixo aleatório: com a fila, saves de sessões diferentes no mesmo segundo vão no mesmo lote.
+    sim_id = f"sim_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:6]}"
     
     try:
-        row = [
-            sim_id, 
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 
-            str(res.get('client_name','')), 
-            str(res.get('client_code','')),
-            st.session_state.get('user_name',''), 
-            float(res.get('total_contribution',0)), 
-            int(res.get('num_months',0)),
-            float(res.get('annual_interest_rate',0)), 
-            float(res.get('spe_percentage',0)), 
-            int(res.get('land_size',0)),
-            float(res.get('construction_cost_m2',0)), 
-            float(res.get('value_m2',0)), 
-            float(res.get('area_exchange_percentage',0)),
-            float(res.get('vgv',0)), 
-            float(res.get('total_construction_cost',0)), 
-            float(res.get('final_operational_result',0)),
-            float(res.get('valor_participacao',0)), 
-            float(res.get('resultado_final_investidor',0)), 
-            float(res.get('roi',0)),
-            float(res.get('roi_anualizado',0)), 
-            float(res.get('valor_corrigido',0)),
-            str(res.get('start_date')), 
-            str(res.get('project_end_date'))
-        ]
-        worksheets["simulations"].append_row(row, value_input_option='USER_ENTERED')
-        
-        aps_rows = [[sim_id, str(a['date']), float(a['value'])] for a in res.get('aportes',[])]
-        if aps_rows: 
-            worksheets["aportes"].append_rows(aps_rows, value_input_option='USER_ENTERED')
+        with perf.timed("callback.save"):
+            row = storage.simulation_row(res, sim_id, st.session_state.get('user_name',''))
+            save_queue.submit(sim_id, row, storage.aporte_rows(res, sim_id))
             
         st.session_state.simulation_saved = True
-        st.toast("Salvo com sucesso!", icon="✅")
+        st.session_state.last_saved_id = sim_id
+        st.toast("Salvando em segundo plano...", icon="⏳")
         
     except Exception as e: 
         st.error(f"Erro ao salvar: {e}")
+
+@st.fragment(run_every=2)
+def poll_save_status(sim_id):
+    st.caption("⏳ Gravando simulação...")
+    if save_queue.status(sim_id)[0] != write_queue.PENDING: st.rerun()
+
+def render_save_status():
+    """Estado da gravação da última simulação salva (a tela se atualiza sozinha enquanto está na fila)."""
+    sim_id = st.session_state.get('last_saved_id')
+    if not sim_id or not save_queue: return
+    status, error = save_queue.status(sim_id)
+    if status == write_queue.PENDING:
+        poll_save_status(sim_id)
+    elif status == write_queue.COMMITTED:
+        st.caption("✅ Simulação gravada.")
+    elif status == write_queue.FAILED:
+        st.error(f"Erro ao salvar: {error}")
+        if st.button("Tentar novamente", key=f"retry_{sim_id}"):
+            # Mesmo id: as abas que já tinham entrado não são gravadas de novo.
+            if not save_queue.retry(sim_id):
+                st.session_state.simulation_saved = False
+                st.session_state.last_saved_id = None
+            st.rerun()
+
+HISTORY_SORT_OPTIONS = {
+    "Data": 'created_at',
+    "Cliente": 'client_name',
+    "ROI Anual": 'roi_anualizado',
+    "Lucro Líquido": 'resultado_final_investidor',
+}
+HISTORY_PAGE_SIZES = [10, 20, 50, 100]
+
+def toggle_history_selection(simulation_id):
+    selected = st.session_state.setdefault('history_selected', set())
+    if st.session_state.get(f"sel_{simulation_id}"): selected.add(simulation_id)
+    else: selected.discard(simulation_id)
+
+def clear_history_selection(simulation_ids=None):
+    """Tira as simulações (todas, por padrão) da seleção, junto com o estado dos checkboxes."""
+    selected = st.session_state.setdefault('history_selected', set())
+    for sid in list(selected if simulation_ids is None else simulation_ids):
+        selected.discard(sid)
+        st.session_state.pop(f"sel_{sid}", None)  # com key, o checkbox ignora `value` depois do 1º render
+
+def render_bulk_export(df, positions):
+    """Exporta em ZIP os PDFs das simulações selecionadas ou de todo o resultado da busca."""
+    import export
+    selected = st.session_state.get('history_selected', set())
+    with st.expander("📦 Exportar relatórios em PDF (ZIP)"):
+        labels = {'selected': f"Selecionadas ({len(selected)})", 'search': f"Resultado da busca ({len(positions)})"}
+        options = ['selected', 'search'] if selected else ['search']
+        scope = st.radio("Simulações", options, format_func=labels.get, horizontal=True)
+        
+        if st.button("Gerar ZIP", type="primary", disabled=not len(positions) and not selected):
+            targets = df[df['simulation_id'].isin(selected)] if scope == 'selected' else df.iloc[positions]
+            bar = st.progress(0.0, text="Gerando relatórios...")
+            try:
+                old_path = st.session_state.pop('export_zip', None)
+                if old_path and os.path.exists(old_path): os.remove(old_path)
+                path = export.export_zip(
+                    export.report_payloads(targets, backend.aportes_index()), len(targets),
+                    progress=lambda done, total: bar.progress(done / total, text=f"Gerando relatórios... {done}/{total}"))
+                st.session_state.export_zip = path
+                bar.empty()
+            except Exception as e:
+                bar.empty()
+                st.error(f"Erro ao exportar: {e}")
         
+        path = st.session_state.get('export_zip')
+        if path and os.path.exists(path):
+            st.download_button("Baixar ZIP", data=lambda: export.take_zip(path), use_container_width=True,
+                               file_name=f"relatorios_{datetime.now().strftime('%Y%m%d')}.zip", mime="application/zip")
+
+@perf.timed("page.historico")
 def render_history_page():
     st.title("Histórico de Simulações")
     
-    if not worksheets: 
+    if not backend: 
         st.error("Erro de conexão com banco de dados.")
         return
         
     with st.spinner("Carregando histórico..."):
-        df = utils.load_data_from_sheet(worksheets["simulations"], "simulations")
+        index = backend.search_index()
+        df = index.frame
     
     if df.empty: 
         st.info("Nenhuma simulação encontrada.")
         return
     
-    c_search, c_sort = st.columns([3, 1])
-    search = c_search.text_input("🔍 Buscar Cliente", placeholder="Digite o nome...")
+    c_search, c_sort, c_order, c_size = st.columns([3, 1.2, 1, 0.8])
+    search = c_search.text_input("🔍 Buscar Cliente", placeholder="Nome, código ou usuário...")
+    sort_label = c_sort.selectbox("Ordenar por", list(HISTORY_SORT_OPTIONS))
+    descending = c_order.selectbox("Ordem", ["Decrescente", "Crescente"]) == "Decrescente"
+    page_size = c_size.selectbox("Por página", HISTORY_PAGE_SIZES, index=1)
     
-    if search:
-        df = df[df['client_name'].str.lower().str.contains(search.lower(), na=False)]
+    # Índice pré-construído (por versão dos dados): devolve as posições já filtradas e ordenadas.
+    positions = index.search(search, HISTORY_SORT_OPTIONS[sort_label], descending)
     
-    df = df.sort_values('created_at', ascending=False)
+    total = len(positions)
+    n_pages = max(1, -(-total // page_size))
+    # Volta para a primeira página quando a busca/ordenação/tamanho mudam.
+    view_key = (search, sort_label, descending, page_size)
+    if st.session_state.get('history_view') != view_key:
+        st.session_state.history_view = view_key
+        st.session_state.history_page = 1
+    st.session_state.history_page = min(st.session_state.get('history_page', 1), n_pages)
     
+    render_bulk_export(df, positions)
+    
+    # Só a página atual é formatada e renderizada; os valores viram colunas antes do loop.
+    start = (st.session_state.history_page - 1) * page_size
+    page = df.iloc[positions[start:start + page_size]]
+    roi = pd.to_numeric(page['roi_anualizado'], errors='coerce').fillna(0)
+    page_cols = pd.DataFrame({
+        'client_n': page['client_name'].fillna('Cliente sem nome'),
+        'roi_val': roi,
+        'date_fmt': utils.format_date(page['created_at'], "%d/%m/%Y às %H:%M"),
+        'profit': utils.format_brl(page['resultado_final_investidor']),
+        'border_color': np.select([roi > 15, roi > 0], ["#4CAF50", "#FF9800"], "#F44336"),
+    }, index=page.index)
+    
+    st.caption(f"Mostrando {start + 1 if total else 0}–{start + len(page)} de {total} simulações")
+    
+    selected = st.session_state.setdefault('history_selected', set())
+    if selected:
+        c_msg, c_del, c_clear = st.columns([3, 1.2, 1])
+        c_msg.warning(f"{len(selected)} simulação(ões) selecionada(s).")
+        if c_del.button(f"🗑️ Excluir selecionadas ({len(selected)})", type="primary", use_container_width=True):
+            try:
+                n = backend.delete_simulations(selected)
+                clear_history_selection()
+                st.toast(f"{n} simulação(ões) removida(s) com sucesso!", icon="🗑️")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Erro ao excluir: {e}")
+        if c_clear.button("Limpar seleção", use_container_width=True):
+            clear_history_selection()
+            st.rerun()
     st.write("")
     
-    for i, row in df.iterrows():
-        client_n = row.get('client_name', 'Cliente sem nome')
-        roi_val = float(row.get('roi_anualizado', 0))
-        date_fmt = safe_date_to_string(row.get('created_at'), "%d/%m/%Y às %H:%M")
-        profit = utils.format_currency(row.get('resultado_final_investidor', 0))
-        
-        border_color = "#4CAF50" if roi_val > 15 else "#FF9800" if roi_val > 0 else "#F44336"
-        
+    for (i, row), (client_n, roi_val, date_fmt, profit, border_color) in zip(page.iterrows(), page_cols.itertuples(index=False)):
         with st.container():
             c_info, c_actions = st.columns([3, 1.5]) 
             
@@ -406,7 +500,10 @@ def render_history_page():
             
             with c_actions:
                 st.write("") 
-                b_col1, b_col2, b_col3 = st.columns(3)
+                b_sel, b_col1, b_col2, b_col3 = st.columns(4)
+                sid = row['simulation_id']
+                b_sel.checkbox("Selecionar", value=sid in selected, key=f"sel_{sid}", label_visibility="collapsed",
+                               on_change=toggle_history_selection, args=(sid,), help="Selecionar para exclusão em lote")
                 
                 if b_col1.button("✏️", key=f"edit_{i}", help="Editar essa simulação"):
                     for k, v in row.items():
@@ -416,12 +513,7 @@ def render_history_page():
                             else:
                                 st.session_state[k] = v
                     
-                    df_ap = utils.load_data_from_sheet(worksheets["aportes"], "aportes")
-                    if not df_ap.empty:
-                        aps = df_ap[df_ap['simulation_id'] == row['simulation_id']]
-                        st.session_state.aportes = [{'data': utils._ensure_date(r['data_aporte']), 'valor': float(r['valor_aporte'])} for _, r in aps.iterrows()]
-                    else:
-                        st.session_state.aportes = []
+                    st.session_state.aportes = backend.load_schedule(row['simulation_id'], 'data', 'valor')
                     
                     st.session_state.client_name = row.get('client_name', '')
                     st.session_state.client_code = row.get('client_code', '')
@@ -432,12 +524,7 @@ def render_history_page():
                 
                 if b_col2.button("👁️", key=f"view_{i}", help="Visualizar relatório"):
                     view_obj = row.to_dict()
-                    df_ap = utils.load_data_from_sheet(worksheets["aportes"], "aportes")
-                    if not df_ap.empty:
-                        aps = df_ap[df_ap['simulation_id'] == row['simulation_id']]
-                        view_obj['aportes'] = [{'date': utils._ensure_date(r['data_aporte']), 'value': float(r['valor_aporte'])} for _, r in aps.iterrows()]
-                    else:
-                        view_obj['aportes'] = []
+                    view_obj['aportes'] = backend.load_schedule(row['simulation_id'])
                     
                     st.session_state.simulation_to_view = view_obj
                     st.session_state.page = "Ver Simulação"
@@ -445,10 +532,8 @@ def render_history_page():
 
                 if b_col3.button("🗑️", key=f"del_{i}", help="Excluir permanentemente"):
                     try:
-                        row_idx = int(row['row_index'])
-                        worksheets["simulations"].delete_rows(row_idx)
-                        
-                        utils.load_data_from_sheet.clear()
+                        backend.delete_simulation(sid)
+                        clear_history_selection([sid])
                         
                         st.toast("Simulação removida com sucesso!", icon="🗑️")
                         st.rerun()
@@ -457,6 +542,17 @@ def render_history_page():
             
             st.divider()
 
+    if n_pages > 1:
+        c_prev, c_page, c_next = st.columns([1, 2, 1])
+        if c_prev.button("◀ Anterior", disabled=st.session_state.history_page <= 1, use_container_width=True):
+            st.session_state.history_page -= 1
+            st.rerun()
+        c_page.markdown(f"<div style='text-align:center; padding-top:6px;'>Página {st.session_state.history_page} de {n_pages}</div>", unsafe_allow_html=True)
+        if c_next.button("Próxima ▶", disabled=st.session_state.history_page >= n_pages, use_container_width=True):
+            st.session_state.history_page += 1
+            st.rerun()
+
+@perf.timed("page.ver_simulacao")
 def render_view_simulation_page():
     st.title("Visualizar Simulação")
     if st.button("Voltar ao Histórico"):
@@ -464,26 +560,25 @@ def render_view_simulation_page():
         st.rerun()
     
     if st.session_state.simulation_to_view:
-        res = utils.calculate_financials(st.session_state.simulation_to_view)
+        from ui_components import display_full_results
+        res = utils.calculate_financials_cached(st.session_state.simulation_to_view)
         display_full_results(res, show_download_button=True, is_simulation_saved=True)
 
 
+@perf.timed("page.dashboard")
 def render_dashboard_page():
     st.title("Intelligence Dashboard")
     st.markdown("Análise estratégica de viabilidade e performance de portfólio.")
     
-    if not worksheets: return
-    df = utils.load_data_from_sheet(worksheets["simulations"], "simulations")
+    if not backend: return
+    import plotly.express as px
+    import plotly.graph_objects as go
+    summary = backend.dashboard_summary()
     
-    if df.empty:
+    if not summary['n']:
         st.info("Dados insuficientes para gerar dashboard.")
         return
 
-    total_vgv = df['vgv'].sum()
-    avg_roi = df['roi_anualizado'].mean()
-    total_investido = df['total_contribution'].sum()
-    lucro_total = df['resultado_final_investidor'].sum()
-
     st.markdown("""
     <style>
     .kpi-card {
@@ -504,10 +599,10 @@ def render_dashboard_page():
     def kpi_html(label, value, subtext=""):
         return f"""<div class="kpi-card"><div class="kpi-label">{label}</div><div class="kpi-value">{value}</div><div class="kpi-sub">{subtext}</div></div>"""
 
-    with k1: st.markdown(kpi_html("VGV Potencial", utils.format_currency(total_vgv), f"{len(df)} projetos"), unsafe_allow_html=True)
-    with k2: st.markdown(kpi_html("Capital Captado", utils.format_currency(total_investido)), unsafe_allow_html=True)
-    with k3: st.markdown(kpi_html("Lucro Projetado", utils.format_currency(lucro_total)), unsafe_allow_html=True)
-    with k4: st.markdown(kpi_html("ROI Médio (a.a.)", f"{avg_roi:.2f}%"), unsafe_allow_html=True)
+    with k1: st.markdown(kpi_html("VGV Potencial", utils.format_currency(summary['total_vgv']), f"{summary['n']} projetos"), unsafe_allow_html=True)
+    with k2: st.markdown(kpi_html("Capital Captado", utils.format_currency(summary['total_investido'])), unsafe_allow_html=True)
+    with k3: st.markdown(kpi_html("Lucro Projetado", utils.format_currency(summary['lucro_total'])), unsafe_allow_html=True)
+    with k4: st.markdown(kpi_html("ROI Médio (a.a.)", f"{summary['avg_roi']:.2f}%"), unsafe_allow_html=True)
 
     st.divider()
     
@@ -515,43 +610,61 @@ def render_dashboard_page():
     
     with c_charts_1:
         st.subheader("Risco x Retorno (Dispersão)")
-        fig_scatter = px.scatter(
-            df, 
-            x='total_contribution', 
-            y='roi_anualizado',
-            size='resultado_final_investidor',
-            color='roi_anualizado',
-            hover_name='client_name',
-            color_continuous_scale='RdYlGn',
-            labels={'total_contribution': 'Investimento Total (R$)', 'roi_anualizado': 'ROI Anualizado (%)'},
-            title="Eficiência do Capital"
-        )
+        sc = summary['scatter']
+        if sc['mode'] == 'density':
+            # Muitas simulações: densidade calculada no servidor + amostra de pontos com hover.
+            fig_scatter = go.Figure(go.Heatmap(
+                z=sc['counts'], x=(sc['x_edges'][:-1] + sc['x_edges'][1:]) / 2, y=(sc['y_edges'][:-1] + sc['y_edges'][1:]) / 2,
+                colorscale='Greys', reversescale=True, showscale=False, zmin=0,
+                hovertemplate="Investimento ~ R$ %{x:,.0f}<br>ROI ~ %{y:.2f}%<br>%{z} simulações<extra></extra>"
+            ))
+            fig_scatter.add_trace(go.Scattergl(
+                x=sc['x'], y=sc['y'], mode='markers', customdata=sc['names'],
+                marker={'color': sc['y'], 'colorscale': 'RdYlGn', 'size': 6, 'colorbar': {'title': 'ROI Anualizado (%)'}},
+                hovertemplate="%{customdata}<br>Investimento: R$ %{x:,.0f}<br>ROI: %{y:.2f}%<extra></extra>"
+            ))
+            fig_scatter.update_layout(title=f"Eficiência do Capital ({summary['n']:,} simulações, {len(sc['x']):,} em destaque)",
+                                      xaxis_title='Investimento Total (R$)', yaxis_title='ROI Anualizado (%)')
+        else:
+            fig_scatter = px.scatter(
+                x=sc['x'], 
+                y=sc['y'],
+                size=sc['size'],
+                color=sc['y'],
+                hover_name=sc['names'],
+                color_continuous_scale='RdYlGn',
+                labels={'x': 'Investimento Total (R$)', 'y': 'ROI Anualizado (%)', 'color': 'ROI Anualizado (%)', 'size': 'Lucro (R$, absoluto)'},
+                title="Eficiência do Capital",
+                render_mode='webgl' if len(sc['x']) > dashboard.WEBGL_THRESHOLD else 'svg'
+            )
         fig_scatter.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='white')
-        fig_scatter.add_hline(y=df['roi_anualizado'].mean(), line_dash="dot", annotation_text="Média", annotation_position="bottom right")
+        fig_scatter.add_hline(y=summary['avg_roi'], line_dash="dot", annotation_text="Média", annotation_position="bottom right")
         st.plotly_chart(fig_scatter, use_container_width=True)
 
     with c_charts_2:
         st.subheader("Distribuição de ROI")
-        fig_hist = px.histogram(
-            df, 
-            x='roi_anualizado', 
-            nbins=10, 
-            color_discrete_sequence=['#E37026'],
-            title="Histograma de Rentabilidade"
-        )
-        fig_hist.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='white', yaxis_title="Frequência")
+        hist = summary['roi_hist']
+        fig_hist = go.Figure(go.Bar(
+            x=(hist['edges'][:-1] + hist['edges'][1:]) / 2,
+            y=hist['counts'],
+            width=np.diff(hist['edges']),
+            marker_color='#E37026',
+            hovertemplate="ROI %{x:.2f}%<br>%{y} simulações<extra></extra>"
+        ))
+        fig_hist.update_layout(title="Histograma de Rentabilidade", plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                               font_color='white', xaxis_title="roi_anualizado", yaxis_title="Frequência", bargap=0)
         st.plotly_chart(fig_hist, use_container_width=True)
         
     c3, c4 = st.columns(2)
     
     with c3:
         st.subheader("Evolução do Portfólio")
-        df_sorted = df.sort_values('created_at')
+        acc = summary['vgv_acumulado']
         fig_line = px.area(
-            df_sorted, 
-            x='created_at', 
-            y='vgv', 
+            x=acc['dates'], 
+            y=acc['values'], 
             title="Crescimento do VGV Acumulado (Simulado)",
+            labels={'x': 'created_at', 'y': 'vgv'},
             line_shape='spline',
             color_discrete_sequence=['#00E676']
         )
@@ -562,27 +675,87 @@ def render_dashboard_page():
         st.subheader("Top 5 Projetos (ROI)")
         st.space("large")
         st.space("small")
-        top_5 = df.nlargest(5, 'roi_anualizado')[['client_name', 'roi_anualizado', 'resultado_final_investidor']]
-        top_5['roi_anualizado'] = top_5['roi_anualizado'].apply(lambda x: f"{x:.2f}%")
-        top_5['resultado_final_investidor'] = top_5['resultado_final_investidor'].apply(utils.format_currency)
-        top_5.rename(columns={'client_name': 'Cliente', 'roi_anualizado': 'ROI', 'resultado_final_investidor': 'Lucro'}, inplace=True)
-        
         st.dataframe(
-            top_5, 
+            summary['top'], 
             use_container_width=True, 
             hide_index=True,
             column_config={"ROI": st.column_config.TextColumn("ROI", help="Retorno sobre Investimento Anualizado")}
         )
 
+def is_admin():
+    try: admins = st.secrets.get("admins", [])
+    except Exception: admins = []
+    return st.session_state.get('user_name') in admins
+
+@perf.timed("page.desempenho")
+def render_perf_page():
+    st.title("Desempenho")
+    rec = perf.RECORDER
+    ring = f"{perf.RING_SIZE:,}".replace(",", ".")
+    st.caption(f"Medições deste processo desde {datetime.fromtimestamp(rec.started_at):%d/%m/%Y %H:%M:%S} "
+               f"(buffer das últimas {ring}).")
+
+    c1, c2, _ = st.columns([1, 1, 3])
+    c1.download_button("⬇️ Exportar JSON", data=rec.to_json, mime="application/json", use_container_width=True,
+                       file_name=f"desempenho_{datetime.now():%Y%m%d_%H%M%S}.json")
+    if c2.button("Limpar medições", use_container_width=True):
+        rec.clear()
+        st.rerun()
+
+    st.subheader("Tempos por operação (ms)")
+    stats = rec.stats()
+    if stats:
+        st.dataframe(pd.DataFrame(stats).rename(columns={
+            'name': 'Operação', 'calls': 'Chamadas', 'p50_ms': 'p50', 'p95_ms': 'p95', 'p99_ms': 'p99',
+            'max_ms': 'Máximo', 'total_ms': 'Total'}), hide_index=True, use_container_width=True)
+    else:
+        st.info("Nenhuma medição ainda.")
+
+    st.subheader("Caches")
+    counters = rec.counters()
+    result_cache, pdf_cache = utils.get_result_cache(), utils.get_pdf_cache()
+    caches = [
+        ("Dados em memória (DataStore)", counters.get('store.hit', 0), counters.get('store.reconcile', 0)),
+        *[(name, counters.get(f'{name}.hit', 0), counters.get(f'{name}.miss', 0)) for name in ('search_index', 'aportes_index', 'dashboard')],
+        ("Resultados financeiros", result_cache.hits, result_cache.misses),
+        ("PDFs", pdf_cache.hits, pdf_cache.misses),
+    ]
+    df_caches = pd.DataFrame(caches, columns=['Cache', 'Acertos', 'Falhas'])
+    total = df_caches['Acertos'] + df_caches['Falhas']
+    df_caches['Taxa de acerto'] = utils.format_percent(df_caches['Acertos'] / total.replace(0, np.nan) * 100, 1)
+    st.dataframe(df_caches, hide_index=True, use_container_width=True)
+    fetched = {k.rsplit('.', 1)[1]: v for k, v in counters.items() if k.startswith('sheet.rows_fetched.')}
+    if fetched:
+        st.caption("Linhas baixadas da planilha: " + " · ".join(f"{tab}: {n:,}".replace(",", ".") for tab, n in fetched.items()))
+    if save_queue:
+        q = save_queue.stats()
+        st.caption(f"Fila de gravação: {q['pending']} pendentes · {q['committed']} gravadas · {q['failed']} com falha")
+
+    st.subheader("Reruns mais lentos")
+    slow = rec.slowest("rerun")
+    if slow:
+        st.dataframe(pd.DataFrame([{'Quando': datetime.fromtimestamp(at).strftime('%d/%m %H:%M:%S'), 'Página': meta.get('page', ''),
+                                    'Usuário': meta.get('user', ''), 'ms': round(ms, 1)} for _, at, ms, meta in slow]),
+                     hide_index=True, use_container_width=True)
+    else:
+        st.info("Nenhum rerun completo registrado.")
+
 if 'authenticated' not in st.session_state: st.session_state.authenticated = False
 
 if st.session_state.authenticated:
+    backend = storage.init_storage()
+    save_queue = storage.init_write_queue(backend) if backend else None
+
     with st.sidebar:
-        st.image("Lavie2.png")
+        assets.show("Lavie2.png")
         st.divider()
         st.caption(f"Logado: {st.session_state.get('user_name')}")
         
         page_list = ["Nova Simulação", "Histórico", "Dashboard"]
+        icons = ["calculator", "clock", "graph-up"]
+        if is_admin():
+            page_list.append("Desempenho")
+            icons.append("speedometer2")
         
         current_active = st.session_state.page
         if current_active == "Ver Simulação": current_active = "Histórico"
@@ -592,7 +765,7 @@ if st.session_state.authenticated:
         except:
             default_ix = 0
             
-        sel = option_menu("Menu", page_list, icons=["calculator", "clock", "graph-up"], default_index=default_ix)
+        sel = option_menu("Menu", page_list, icons=icons, default_index=default_ix)
         st.divider()
         
         if st.button("Sair", use_container_width=True):
@@ -607,6 +780,12 @@ if st.session_state.authenticated:
     elif st.session_state.page == "Histórico": render_history_page()
     elif st.session_state.page == "Ver Simulação": render_view_simulation_page()
     elif st.session_state.page == "Dashboard": render_dashboard_page()
+    elif st.session_state.page == "Desempenho" and is_admin(): render_perf_page()
 
 else:
     render_login_page()
+
+# Só reruns que chegam ao fim entram aqui (os interrompidos por st.rerun() são curtos).
+perf.RECORDER.record("rerun", (time.perf_counter() - _rerun_started) * 1000,
+                     page=st.session_state.page if st.session_state.authenticated else "Login",
+                     user=st.session_state.get('user_name', ''))
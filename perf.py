@@ -0,0 +1,82 @@
+import json
+import time
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+
+RING_SIZE = 10_000   # medições mantidas no processo; as mais antigas saem primeiro
+SLOWEST_N = 20
+
+class Recorder:
+    """Buffer circular de medições (nome, instante, duração em ms, detalhes) e contadores do processo.
+
+    Compartilhado por todas as sessões; cada processo (ex.: os filhos da exportação em ZIP) tem o seu.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self._events = deque(maxlen=size)
+        self._counters = Counter()
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, name, ms, **meta):
+        with self._lock:
+            self._events.append((name, time.time(), ms, meta))
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def events(self, prefix=""):
+        with self._lock:
+            return [e for e in self._events if e[0].startswith(prefix)]
+
+    def counters(self):
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def stats(self, prefix=""):
+        """Uma linha por nome: chamadas, p50/p95/p99, máximo e total (ms)."""
+        by_name = {}
+        for name, _, ms, _ in self.events(prefix):
+            by_name.setdefault(name, []).append(ms)
+        rows = []
+        for name, values in sorted(by_name.items()):
+            v = np.asarray(values)
+            p50, p95, p99 = np.percentile(v, [50, 95, 99])
+            rows.append({'name': name, 'calls': len(v), 'p50_ms': round(float(p50), 2), 'p95_ms': round(float(p95), 2),
+                         'p99_ms': round(float(p99), 2), 'max_ms': round(float(v.max()), 2), 'total_ms': round(float(v.sum()), 1)})
+        return rows
+
+    def slowest(self, prefix, n=SLOWEST_N):
+        return sorted(self.events(prefix), key=lambda e: e[2], reverse=True)[:n]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    def to_json(self):
+        events = [{'name': name, 'at': datetime.fromtimestamp(at).isoformat(timespec='milliseconds'), 'ms': round(ms, 3), **meta}
+                  for name, at, ms, meta in self.events()]
+        return json.dumps({'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+                           'exported_at': datetime.now().isoformat(timespec='seconds'),
+                           'stats': self.stats(), 'counters': self.counters(), 'events': events},
+                          ensure_ascii=False, indent=2, default=str)
+
+RECORDER = Recorder()
+
+@contextmanager
+def timed(name, **meta):
+    """Mede o bloco (ou cada chamada da função decorada) e registra em `RECORDER`, mesmo se ele falhar."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        RECORDER.record(name, (time.perf_counter() - t0) * 1000, **meta)
+
+def count(name, n=1):
+    RECORDER.count(name, n)
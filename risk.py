@@ -0,0 +1,93 @@
+import numpy as np
+import multiprocessing
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+import utils
+
+DEFAULT_CHUNK_SIZE = 50_000
+HIST_BINS = 60
+
+MC_DEFAULTS = {
+    'price_sd': 0.10,          # desvio-padrão relativo do valor de venda (normal)
+    'cost_low': -0.05,         # custo da obra: triangular relativa (mín, moda, máx)
+    'cost_mode': 0.0,
+    'cost_high': 0.25,
+    'exchange_sd': 2.0,        # desvio-padrão da permuta, em pontos percentuais (normal)
+    'delay_mode_days': 0,      # atraso do término: triangular em dias (0, moda, máx)
+    'delay_max_days': 365,
+}
+
+def _delay_table(results, max_delay_days):
+    """Parte dos juros para cada atraso possível (0..max dias); os caminhos só indexam esta tabela."""
+    schedule = utils._cached_schedule_arrays(utils._schedule_key(results.get('aportes', [])))
+    dt_end = utils._ensure_date(results.get('project_end_date'))
+    rate = results.get('annual_interest_rate', 0)
+    scheds = [utils._schedule_stage(schedule, dt_end + timedelta(days=d), rate) for d in range(max_delay_days + 1)]
+    return {k: np.array([s[k] for s in scheds], dtype=float) for k in ('total_contribution', 'valor_corrigido', 'juros_investidor', 'total_days_for_roi')}
+
+def _simulate_chunk(args):
+    """Simula um bloco de caminhos com seu próprio gerador; devolve (roi_anualizado, lucro)."""
+    seed_seq, n, base, table, dist = args
+    rng = np.random.default_rng(seed_seq)
+
+    value_m2 = base['value_m2'] * np.maximum(rng.normal(1.0, dist['price_sd'], n), 0)
+    if dist['cost_high'] > dist['cost_low']:
+        cost_m2 = base['construction_cost_m2'] * (1 + rng.triangular(dist['cost_low'], dist['cost_mode'], dist['cost_high'], n))
+    else:
+        cost_m2 = np.full(n, base['construction_cost_m2'] * (1 + dist['cost_low']))  # sem incerteza no custo
+    exchange = np.clip(rng.normal(base['area_exchange_percentage'], dist['exchange_sd'], n), 0, 100)
+    if dist['delay_max_days'] > 0:
+        mode = min(dist['delay_mode_days'], dist['delay_max_days'])
+        delay = np.rint(rng.triangular(0, mode, dist['delay_max_days'], n)).astype(np.int64)
+    else:
+        delay = np.zeros(n, dtype=np.int64)
+
+    sched = {k: v[delay] for k, v in table.items()}
+    proj = utils._project_stage(sched, base['land_size'], value_m2, cost_m2, exchange, base['spe_percentage'])
+    return proj['roi_anualizado'], proj['resultado_final_investidor']
+
+def run_monte_carlo(results, n_paths=100_000, seed=42, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, **dist):
+    """Simulação de Monte Carlo sobre valor de venda, custo da obra, permuta e atraso do término.
+
+    Os caminhos são processados em blocos de `chunk_size` (memória limitada) e cada bloco tem
+    uma semente derivada de `seed`, então o resultado é o mesmo com ou sem `workers` (pool de processos).
+    """
+    dist = {**MC_DEFAULTS, **{k: v for k, v in dist.items() if v is not None}}
+    dist['delay_max_days'] = int(max(0, dist['delay_max_days']))
+    base = {k: float(results.get(k, 0)) for k in utils.PROJECT_INPUTS}
+    table = _delay_table(results, dist['delay_max_days'])
+
+    sizes = [min(chunk_size, n_paths - i) for i in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, n, base, table, dist) for s, n in zip(seeds, sizes)]
+
+    roi = np.empty(n_paths)
+    lucro = np.empty(n_paths)
+    # spawn, como na exportação: o fork copiaria as threads do servidor do Streamlit.
+    pool = (ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            if workers and workers > 1 and len(tasks) > 1 else None)
+    try:
+        chunks = pool.map(_simulate_chunk, tasks) if pool else map(_simulate_chunk, tasks)
+        offset = 0
+        for r, l in chunks:
+            roi[offset:offset + len(r)], lucro[offset:offset + len(l)] = r, l
+            offset += len(r)
+    finally:
+        if pool: pool.shutdown()
+
+    return {'roi_anualizado': roi, 'resultado_final_investidor': lucro, 'summary': summarize(roi, lucro), 'seed': seed, 'n_paths': n_paths}
+
+def compact(mc, bins=HIST_BINS):
+    """Só o que a tela mostra (resumo e histograma do lucro), sem os arrays por caminho."""
+    counts, edges = np.histogram(mc['resultado_final_investidor'], bins=bins)
+    return {'summary': mc['summary'], 'seed': mc['seed'], 'n_paths': mc['n_paths'],
+            'hist_share': counts / mc['n_paths'], 'hist_edges': edges}
+
+def summarize(roi, lucro):
+    p_roi = [float(v) for v in np.percentile(roi, [5, 50, 95])]
+    p_lucro = [float(v) for v in np.percentile(lucro, [5, 50, 95])]
+    return {
+        'roi_p5': p_roi[0], 'roi_p50': p_roi[1], 'roi_p95': p_roi[2], 'roi_mean': float(roi.mean()),
+        'lucro_p5': p_lucro[0], 'lucro_p50': p_lucro[1], 'lucro_p95': p_lucro[2], 'lucro_mean': float(lucro.mean()),
+        'prob_loss': float((lucro < 0).mean()),
+    }
@@ -0,0 +1,188 @@
+import os
+import bisect
+import hashlib
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+
+DATA_DIR = os.environ.get("SIMULADOR_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"))
+MIRROR_PATH = os.path.join(DATA_DIR, "sheets_mirror.sqlite")
+
+# Releitura completa periódica, comparada linha a linha pelo hash do conteúdo: cobre edições feitas
+# à mão direto na planilha (a sincronização incremental só enxerga a 1ª coluna).
+CONTENT_CHECK_INTERVAL = 5 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mirror_meta (
+    tab TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    header TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    full_synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mirror_rows (
+    tab TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    hash TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (tab, seq)
+);
+"""
+
+def _worksheet_source(worksheet):
+    try: return f"{worksheet.spreadsheet.id}:{worksheet.id}"
+    except Exception: return str(getattr(worksheet, 'title', ''))
+
+def _row_hash(data):
+    return hashlib.blake2b(data.encode(), digest_size=8).hexdigest()
+
+class SheetMirror:
+    """Espelho local (SQLite) das abas do Google Sheets com sincronização incremental.
+
+    O app só acrescenta linhas no fim e exclui linhas, então a primeira coluna basta para
+    alinhar a planilha com o espelho: linhas ausentes são removidas localmente e apenas as
+    novas são baixadas. A cada `CONTENT_CHECK_INTERVAL` (ou quando a exclusão cai numa chave
+    repetida e a 1ª coluna não diz qual cópia saiu) a aba é relida inteira e comparada pelo
+    hash de cada linha; a versão só muda se algo mudou de fato.
+    """
+
+    def __init__(self, path=MIRROR_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._row_maps = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        if 'hash' not in {c[1] for c in self._conn.execute("PRAGMA table_info(mirror_rows)")}:
+            # Espelho antigo: as linhas sem hash são regravadas na próxima comparação.
+            self._conn.execute("ALTER TABLE mirror_rows ADD COLUMN hash TEXT NOT NULL DEFAULT ''")
+
+    def version(self, tab_name):
+        """Contador (no processo) que muda sempre que uma sincronização altera a aba."""
+        return self._versions.get(tab_name, 0)
+
+    def _bump(self, tab_name):
+        self._versions[tab_name] = self._versions.get(tab_name, 0) + 1
+
+    def row_map(self, tab_name):
+        """Mapa chave (1ª coluna) -> números das linhas na planilha, segundo o último sync.
+
+        Refeito só quando a versão da aba muda; `remove_rows` o mantém em dia após exclusões.
+        """
+        version = self.version(tab_name)
+        cached = self._row_maps.get(tab_name)
+        if cached is None or cached[0] != version:
+            rows = {}
+            with self._lock:
+                keys = self._conn.execute("SELECT key FROM mirror_rows WHERE tab = ? ORDER BY seq", (tab_name,)).fetchall()
+            for i, (key,) in enumerate(keys):
+                rows.setdefault(key, []).append(i + 2)  # linha 1 é o cabeçalho
+            self._row_maps[tab_name] = cached = (version, rows)
+        return cached[1]
+
+    def remove_rows(self, tab_name, row_numbers):
+        """Aplica localmente a exclusão de linhas (numeração da planilha) já feita na planilha."""
+        if not row_numbers: return
+        with self._lock:
+            seqs = [r[0] for r in self._conn.execute("SELECT seq FROM mirror_rows WHERE tab = ? ORDER BY seq", (tab_name,))]
+            with self._conn:
+                self._conn.executemany("DELETE FROM mirror_rows WHERE tab = ? AND seq = ?",
+                                       [(tab_name, seqs[r - 2]) for r in row_numbers if 0 <= r - 2 < len(seqs)])
+            self._bump(tab_name)
+            gone = set(row_numbers)
+            old = self._row_maps.get(tab_name)
+            if old is not None:
+                # Reindexa o mapa em vez de reler a aba: cada linha sobe o nº de excluídas acima dela.
+                removed = sorted(gone)
+                shifted = {}
+                for key, rows in old[1].items():
+                    kept = [r - bisect.bisect_left(removed, r) for r in rows if r not in gone]
+                    if kept: shifted[key] = kept
+                self._row_maps[tab_name] = (self.version(tab_name), shifted)
+
+    def load(self, tab_name):
+        """Lê a cópia local no formato de `get_all_values` (cabeçalho + linhas)."""
+        with self._lock:
+            meta = self._conn.execute("SELECT header FROM mirror_meta WHERE tab = ?", (tab_name,)).fetchone()
+            if meta is None: return []
+            rows = self._conn.execute("SELECT data FROM mirror_rows WHERE tab = ? ORDER BY seq", (tab_name,)).fetchall()
+        return [json.loads(meta[0])] + [json.loads(r[0]) for r in rows]
+
+    def sync(self, worksheet, tab_name, full=False):
+        """Sincroniza a aba e devolve quantas linhas foram baixadas da planilha."""
+        with self._lock:
+            source = _worksheet_source(worksheet)
+            meta = self._conn.execute(
+                "SELECT source, header, full_synced_at FROM mirror_meta WHERE tab = ?", (tab_name,)).fetchone()
+            now = time.time()
+            if full or meta is None or meta[0] != source or now - meta[2] > CONTENT_CHECK_INTERVAL:
+                return self._full_sync(worksheet, tab_name, source, now)
+
+            header = json.loads(meta[1])
+            remote_keys = worksheet.col_values(1)
+            if not header or not remote_keys or remote_keys[0] != header[0]:
+                return self._full_sync(worksheet, tab_name, source, now)
+            remote_keys = remote_keys[1:]
+
+            local = self._conn.execute("SELECT seq, key FROM mirror_rows WHERE tab = ? ORDER BY seq", (tab_name,)).fetchall()
+            deleted, j = [], 0
+            for seq, key in local:
+                if j < len(remote_keys) and remote_keys[j] == key:
+                    j += 1
+                else:
+                    deleted.append((tab_name, seq, key))
+            if deleted:
+                # Chave repetida (aportes) que ainda existe na planilha: só o conteúdo diz qual cópia saiu.
+                counts, remote_set = Counter(key for _, key in local), set(remote_keys)
+                if any(counts[key] > 1 and key in remote_set for _, _, key in deleted):
+                    return self._full_sync(worksheet, tab_name, source, now)
+
+            new_rows = []
+            if j < len(remote_keys):
+                from gspread.utils import rowcol_to_a1
+                first_row, last_row = j + 2, len(remote_keys) + 1
+                rng = f"A{first_row}:{rowcol_to_a1(last_row, len(header))}"
+                new_rows = [self._pad(r, len(header)) for r in worksheet.get_all_values(range_name=rng)]
+
+            with self._conn:
+                if deleted:
+                    self._conn.executemany("DELETE FROM mirror_rows WHERE tab = ? AND seq = ?", [d[:2] for d in deleted])
+                if new_rows:
+                    next_seq = (local[-1][0] + 1) if local else 0
+                    self._insert(tab_name, new_rows, next_seq)
+                self._conn.execute("UPDATE mirror_meta SET synced_at = ? WHERE tab = ?", (now, tab_name))
+            if deleted or new_rows: self._bump(tab_name)
+            return len(new_rows)
+
+    def _full_sync(self, worksheet, tab_name, source, now):
+        """Relê a aba inteira; só regrava o espelho se a sequência de hashes das linhas mudou."""
+        vals = worksheet.get_all_values()
+        header = vals[0] if vals else []
+        rows = [self._pad(r, len(header)) for r in vals[1:]]
+        meta = self._conn.execute("SELECT source, header FROM mirror_meta WHERE tab = ?", (tab_name,)).fetchone()
+        local = [h for (h,) in self._conn.execute("SELECT hash FROM mirror_rows WHERE tab = ? ORDER BY seq", (tab_name,))]
+        changed = meta != (source, json.dumps(header)) or local != [_row_hash(json.dumps(r)) for r in rows]
+        with self._conn:
+            if changed:
+                self._conn.execute("DELETE FROM mirror_rows WHERE tab = ?", (tab_name,))
+                self._insert(tab_name, rows, 0)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mirror_meta (tab, source, header, synced_at, full_synced_at) VALUES (?, ?, ?, ?, ?)",
+                (tab_name, source, json.dumps(header), now, now))
+        if changed: self._bump(tab_name)
+        return len(rows)
+
+    def _insert(self, tab_name, rows, first_seq):
+        data = [json.dumps(r) for r in rows]
+        self._conn.executemany(
+            "INSERT INTO mirror_rows (tab, seq, key, data, hash) VALUES (?, ?, ?, ?, ?)",
+            [(tab_name, first_seq + i, str(r[0]) if r else '', d, _row_hash(d)) for i, (r, d) in enumerate(zip(rows, data))])
+
+    @staticmethod
+    def _pad(row, width):
+        row = [str(v) for v in row[:width]]
+        return row + [''] * (width - len(row))
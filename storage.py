@@ -0,0 +1,491 @@
+import os
+import time
+import re
+import unicodedata
+import sqlite3
+import threading
+import numpy as np
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+import utils
+import dashboard
+import perf
+from sheet_mirror import DATA_DIR
+from write_queue import WriteQueue
+
+SQLITE_PATH = os.path.join(DATA_DIR, "simulador.sqlite")
+
+SIMULATION_COLUMNS = [
+    ('simulation_id', 'TEXT PRIMARY KEY'), ('created_at', 'TEXT'), ('client_name', 'TEXT'), ('client_code', 'TEXT'),
+    ('user_name', 'TEXT'), ('total_contribution', 'REAL'), ('num_months', 'INTEGER'),
+    ('annual_interest_rate', 'REAL'), ('spe_percentage', 'REAL'), ('land_size', 'INTEGER'),
+    ('construction_cost_m2', 'REAL'), ('value_m2', 'REAL'), ('area_exchange_percentage', 'REAL'),
+    ('vgv', 'REAL'), ('total_construction_cost', 'REAL'), ('final_operational_result', 'REAL'),
+    ('valor_participacao', 'REAL'), ('resultado_final_investidor', 'REAL'), ('roi', 'REAL'),
+    ('roi_anualizado', 'REAL'), ('valor_corrigido', 'REAL'), ('start_date', 'TEXT'), ('project_end_date', 'TEXT'),
+]
+SIMULATION_FIELDS = [c for c, _ in SIMULATION_COLUMNS]
+APORTE_FIELDS = ['simulation_id', 'data_aporte', 'valor_aporte']
+
+def simulation_row(res, sim_id, user_name):
+    """Linha da aba/tabela `simulations` na ordem de SIMULATION_FIELDS."""
+    return [
+        sim_id,
+        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        str(res.get('client_name','')),
+        str(res.get('client_code','')),
+        user_name,
+        float(res.get('total_contribution',0)),
+        int(res.get('num_months',0)),
+        float(res.get('annual_interest_rate',0)),
+        float(res.get('spe_percentage',0)),
+        int(res.get('land_size',0)),
+        float(res.get('construction_cost_m2',0)),
+        float(res.get('value_m2',0)),
+        float(res.get('area_exchange_percentage',0)),
+        float(res.get('vgv',0)),
+        float(res.get('total_construction_cost',0)),
+        float(res.get('final_operational_result',0)),
+        float(res.get('valor_participacao',0)),
+        float(res.get('resultado_final_investidor',0)),
+        float(res.get('roi',0)),
+        float(res.get('roi_anualizado',0)),
+        float(res.get('valor_corrigido',0)),
+        str(res.get('start_date')),
+        str(res.get('project_end_date'))
+    ]
+
+def aporte_rows(res, sim_id):
+    return [[sim_id, str(a['date']), float(a['value'])] for a in res.get('aportes',[])]
+
+class AportesIndex:
+    """Aportes agrupados por simulation_id: arrays ordenados + fatia (início, fim) por simulação."""
+
+    def __init__(self, df_aportes):
+        self.slices = {}
+        if df_aportes.empty:
+            self.dates = np.array([], dtype='datetime64[D]')
+            self.values = np.array([], dtype=float)
+            return
+        df = df_aportes.sort_values('simulation_id', kind='stable')
+        self.dates = utils.ensure_dates(df['data_aporte'])
+        self.values = pd.to_numeric(df['valor_aporte'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        ids = df['simulation_id'].to_numpy()
+        if len(ids):
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            stops = np.r_[starts[1:], len(ids)]
+            self.slices = dict(zip(ids[starts], zip(starts.tolist(), stops.tolist())))
+
+    def schedule(self, simulation_id, date_key='date', value_key='value'):
+        """Cronograma da simulação como lista de dicts, no formato usado pelo app."""
+        start, stop = self.slices.get(simulation_id, (0, 0))
+        return [{date_key: d, value_key: v} for d, v in zip(self.dates[start:stop].tolist(), self.values[start:stop].tolist())]
+
+SEARCH_FIELDS = ['client_name', 'client_code', 'user_name']
+
+TOKEN_SEPARATOR = r'[^0-9a-z]+'
+
+def _normalize_query(text):
+    """Mesma normalização de `normalize_text`, para uma string só (sem o custo do pandas)."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+def normalize_text(s):
+    """Minúsculas e sem acentos ("João Ávila" -> "joao avila"), coluna inteira de uma vez."""
+    return (s.fillna('').astype(str).str.normalize('NFKD')
+             .str.replace('[\u0300-\u036f]', '', regex=True).str.lower())
+
+class SearchIndex:
+    """Índice da busca do histórico: tokens normalizados ordenados + posições das linhas (CSR).
+
+    Cada termo da consulta casa por prefixo com algum token de SEARCH_FIELDS; todos os termos
+    precisam casar. As ordenações do histórico são pré-calculadas sob demanda, então a busca
+    devolve direto as posições já ordenadas.
+    """
+
+    def __init__(self, df_simulations):
+        self.frame = df_simulations.reset_index(drop=True)
+        self._orders = {}
+        fields = [c for c in SEARCH_FIELDS if c in self.frame.columns]
+        if self.frame.empty or not fields:
+            self.tokens = np.array([], dtype=str)
+            self.rows = np.array([], dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            return
+        text = self.frame[fields[0]].fillna('').astype(str)  # sem o fillna, faltantes viram tokens "nan"/"None"
+        for c in fields[1:]:
+            text = text + ' ' + self.frame[c].fillna('').astype(str)
+        toks = normalize_text(text).str.split(TOKEN_SEPARATOR, regex=True).explode()
+        tokens = toks.to_numpy(dtype=str)
+        rows = toks.index.to_numpy(dtype=np.int64)
+        keep = tokens != ''
+        tokens, rows = tokens[keep], rows[keep]
+        by_token = np.argsort(tokens, kind='stable')  # estável: as linhas continuam crescentes por token
+        tokens, self.rows = tokens[by_token], rows[by_token]
+        starts = np.flatnonzero(np.r_[True, tokens[1:] != tokens[:-1]]) if len(tokens) else np.array([], dtype=np.int64)
+        self.tokens = tokens[starts]
+        self.offsets = np.r_[starts, len(tokens)].astype(np.int64)
+
+    def order(self, column='created_at', descending=True):
+        key = (column, descending)
+        if key not in self._orders:
+            col = self.frame[column] if column in self.frame.columns else pd.Series(index=self.frame.index, dtype=float)
+            if pd.api.types.is_object_dtype(col) or pd.api.types.is_string_dtype(col):
+                col = normalize_text(col).where(col.notna())  # "Álvaro" junto de "alvaro"; vazios no fim
+            self._orders[key] = col.sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+        return self._orders[key]
+
+    def search(self, query, column='created_at', descending=True):
+        """Posições (em `frame`) das linhas que casam com `query`, na ordem pedida."""
+        order = self.order(column, descending)
+        terms = [t for t in re.split(TOKEN_SEPARATOR, _normalize_query(query)) if t]
+        if not terms: return order
+        mask = None
+        width = self.tokens.dtype.itemsize // 4
+        for term in terms:
+            hit = np.zeros(len(self.frame), dtype=bool)
+            if len(term) <= width:
+                # Faixa [term, próximo prefixo) nos tokens ordenados; mesmo dtype evita copiar o array.
+                bounds = np.array([term, term[:-1] + chr(ord(term[-1]) + 1)], dtype=self.tokens.dtype)
+                lo, hi = np.searchsorted(self.tokens, bounds, side='left')
+                hit[self.rows[self.offsets[lo]:self.offsets[hi]]] = True
+            mask = hit if mask is None else mask & hit
+        return order[mask[order]]
+
+RECONCILE_INTERVAL = 5 * 60
+
+def rows_frame(rows, fields):
+    """Linhas no formato gravado (listas na ordem de `fields`) como DataFrame tipado."""
+    return utils.parse_sheet_frame(pd.DataFrame(rows, columns=fields))
+
+def _renumber(df):
+    if 'row_index' in df.columns:
+        df['row_index'] = np.arange(len(df)) + 2
+    return df
+
+class DataStore:
+    """Cópia em memória das abas com contador de versão, compartilhada por todas as sessões.
+
+    Saves e exclusões são aplicados direto nos DataFrames (sem reler a fonte) e incrementam
+    `version`, que os índices derivados usam como chave. A releitura completa fica para a
+    reconciliação periódica (`interval`) ou para quando `external_version` indica escrita de
+    outro processo. Os DataFrames devolvidos são compartilhados: não devem ser alterados.
+    """
+    TABS = ('simulations', 'aportes')
+
+    def __init__(self, fetch, external_version=lambda: None, interval=RECONCILE_INTERVAL):
+        self._fetch = fetch
+        self._external_version = external_version
+        self.interval = interval
+        self._lock = threading.RLock()
+        self._refresh = threading.Lock()  # uma releitura por vez; a leitura da fonte fica fora de `_lock`
+        self._frames = None
+        self._loaded_at = 0.0
+        self._external = None
+        self.version = 0
+
+    def frames(self):
+        with self._lock:
+            stale = (self._frames is None or time.time() - self._loaded_at > self.interval
+                     or self._external_version() != self._external)
+            loaded = self._frames is not None
+        if not stale:
+            perf.count("store.hit")
+        elif not loaded:
+            with self._refresh:  # primeira carga: todos esperam a mesma leitura
+                if self._frames is None: self._reconcile()
+        elif self._refresh.acquire(blocking=False):
+            try: self._reconcile()
+            finally: self._refresh.release()
+        else:
+            perf.count("store.hit")  # outra sessão já está relendo: segue com a cópia atual
+        with self._lock:
+            return self._frames
+
+    def frame(self, tab):
+        return self.frames()[tab]
+
+    def current_version(self):
+        self.frames()
+        with self._lock:
+            return self.version
+
+    def reconcile(self):
+        """Relê tudo da fonte; a versão só muda se o conteúdo mudou."""
+        with self._refresh:
+            self._reconcile()
+
+    def _reconcile(self):
+        # Chamado com `_refresh`: a leitura (lenta, pela rede) não trava as sessões que só leem.
+        perf.count("store.reconcile")
+        with self._lock:
+            external, version = self._external_version(), self.version
+        try:
+            fresh = {}
+            with perf.timed("store.reconcile"):
+                for tab in self.TABS:
+                    with perf.timed(f"store.fetch.{tab}"): fresh[tab] = self._fetch(tab)
+        except Exception as e:
+            with self._lock:
+                if self._frames is None: raise
+                self._loaded_at = time.time()
+            st.warning(f"Não foi possível atualizar os dados; exibindo a última cópia ({e}).")
+            return
+        with self._lock:
+            # Save/exclusão aplicado durante a leitura: a cópia lida pode não tê-lo; relê no próximo acesso.
+            if self.version != version: return
+            changed = self._frames is None or any(not fresh[t].equals(self._frames[t]) for t in self.TABS)
+            self._frames, self._loaded_at, self._external = fresh, time.time(), external
+            if changed: self.version += 1
+
+    def apply_save(self, new_frames):
+        with self._lock:
+            if self._frames is None: return  # ainda não carregado: a primeira leitura já traz tudo
+            frames = dict(self._frames)
+            for tab, add in new_frames.items():
+                if add.empty: continue
+                base = frames[tab]
+                if len(base) and 'simulation_id' in base.columns:
+                    # Uma reconciliação entre a gravação e este patch já pode ter trazido essas linhas.
+                    add = add[~add['simulation_id'].isin(base['simulation_id'])]
+                    if add.empty: continue
+                if len(base.columns): add = add.reindex(columns=base.columns)
+                frames[tab] = _renumber(pd.concat([base, add], ignore_index=True) if len(base) else add.reset_index(drop=True))
+            self._frames = frames
+            self.version += 1
+
+    def apply_delete(self, simulation_ids):
+        ids = list(simulation_ids)
+        with self._lock:
+            if self._frames is None: return
+            frames = {}
+            for tab, df in self._frames.items():
+                frames[tab] = df if df.empty else _renumber(df[~df['simulation_id'].isin(ids)].reset_index(drop=True))
+            self._frames = frames
+            self.version += 1
+
+class StorageBackend:
+    """Interface de persistência das simulações e dos seus aportes.
+
+    Subclasses implementam `_fetch`, `_write_simulations` e `_delete_simulations`; as leituras
+    passam pelo `DataStore` (`self.store`), que recebe os saves e exclusões já aplicados.
+    """
+    name = ""
+    _cache = None
+    store = None
+
+    def _fetch(self, tab):
+        """DataFrame completo da aba/tabela `tab`, lido da fonte."""
+        raise NotImplementedError
+
+    def _external_version(self):
+        """Muda quando outro processo grava na fonte; None quando não é possível saber."""
+        return None
+
+    def _write_simulations(self, items, progress):
+        raise NotImplementedError
+
+    def _delete_simulations(self, simulation_ids):
+        raise NotImplementedError
+
+    def load_simulations(self):
+        return self.store.frame('simulations')
+
+    def load_aportes(self, simulation_id=None):
+        """Aportes de uma simulação (ou todos, sem `simulation_id`) com as colunas de APORTE_FIELDS."""
+        df = self.store.frame('aportes')
+        if df.empty or simulation_id is None: return df
+        return df[df['simulation_id'] == simulation_id]
+
+    def save_simulations(self, items, progress=None):
+        """Grava vários pares (linha da simulação, linhas de aportes) de uma vez.
+
+        `progress` guarda as etapas já concluídas, para que uma nova tentativa retome de onde parou.
+        """
+        with perf.timed("storage.save", backend=self.name, simulations=len(items)):
+            self._write_simulations(items, {} if progress is None else progress)
+        self.store.apply_save({
+            'simulations': rows_frame([row for row, _ in items], SIMULATION_FIELDS),
+            'aportes': rows_frame([a for _, rows in items for a in rows], APORTE_FIELDS),
+        })
+
+    def save_simulation(self, row, aportes):
+        self.save_simulations([(row, aportes)])
+
+    def delete_simulations(self, simulation_ids):
+        """Exclui as simulações e seus aportes de uma vez; devolve quantas simulações saíram."""
+        ids = set(simulation_ids)
+        with perf.timed("storage.delete", backend=self.name, simulations=len(ids)):
+            deleted = self._delete_simulations(ids)
+        self.store.apply_delete(ids)
+        return deleted
+
+    def delete_simulation(self, simulation_id):
+        return self.delete_simulations([simulation_id])
+
+    def data_version(self):
+        """Versão dos dados em memória; muda a cada save, exclusão ou reconciliação com mudanças."""
+        return self.store.current_version()
+
+    def _versioned(self, name, build):
+        """Objeto derivado dos dados, reconstruído apenas quando `data_version` muda."""
+        if self._cache is None: self._cache = {}
+        version = self.data_version()
+        cached = self._cache.get(name)
+        if cached is None or cached[0] != version:
+            perf.count(f"{name}.miss")
+            # Guarda a versão lida antes de construir: se os dados mudarem no meio, reconstrói na próxima.
+            with perf.timed(f"build.{name}"):
+                self._cache[name] = cached = (version, build())
+        else:
+            perf.count(f"{name}.hit")
+        return cached[1]
+
+    def aportes_index(self):
+        """Índice de aportes por simulation_id."""
+        return self._versioned('aportes_index', lambda: AportesIndex(self.load_aportes()))
+
+    def search_index(self):
+        """Índice de busca do histórico (o DataFrame das simulações fica em `.frame`)."""
+        return self._versioned('search_index', lambda: SearchIndex(self.load_simulations()))
+
+    def dashboard_summary(self):
+        """KPIs e séries agregadas do dashboard (ver `dashboard.summarize_portfolio`)."""
+        return self._versioned('dashboard', lambda: dashboard.summarize_portfolio(self.load_simulations()))
+
+    def load_schedule(self, simulation_id, date_key='date', value_key='value'):
+        return self.aportes_index().schedule(simulation_id, date_key, value_key)
+
+class SheetsBackend(StorageBackend):
+    """Google Sheets via gspread: abas `simulations` e `aportes`."""
+    name = "sheets"
+
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+        self._delete_lock = threading.Lock()
+        self.store = DataStore(self._fetch)
+
+    def _fetch(self, tab):
+        return utils.read_sheet_frame(self.worksheets[tab], tab)
+
+    def _write_simulations(self, items, progress):
+        # Aportes primeiro: a simulação só aparece na aba depois que o cronograma dela já está gravado.
+        aportes = [a for _, rows in items for a in rows]
+        if aportes and not progress.get('aportes'):
+            with perf.timed("gspread.append_rows", tab="aportes", rows=len(aportes)):
+                self.worksheets["aportes"].append_rows(aportes, value_input_option='USER_ENTERED')
+            progress['aportes'] = True
+        with perf.timed("gspread.append_rows", tab="simulations", rows=len(items)):
+            self.worksheets["simulations"].append_rows([row for row, _ in items], value_input_option='USER_ENTERED')
+        progress['simulations'] = True
+
+    def _row_map(self, tab, mirror):
+        """simulation_id -> linhas da aba, lido na hora (espelho sincronizado ou 1ª coluna da planilha)."""
+        ws = self.worksheets[tab]
+        if mirror is not None:
+            with perf.timed("gspread.sync", tab=tab): mirror.sync(ws, tab)
+            return mirror.row_map(tab)
+        with perf.timed("gspread.col_values", tab=tab): keys = ws.col_values(1)
+        rows = {}
+        for i, key in enumerate(keys[1:]):
+            rows.setdefault(key, []).append(i + 2)
+        return rows
+
+    @staticmethod
+    def _delete_requests(sheet_id, rows):
+        """Pedidos `deleteDimension` por faixa contígua, de baixo para cima (as linhas acima não se deslocam)."""
+        rows = sorted(set(rows))
+        ranges, start = [], None
+        for i, r in enumerate(rows):
+            if start is None: start = r
+            if i + 1 == len(rows) or rows[i + 1] != r + 1:
+                ranges.append((start, r)); start = None
+        return [{'deleteDimension': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': a - 1, 'endIndex': b}}}
+                for a, b in reversed(ranges)]
+
+    def _delete_simulations(self, ids):
+        mirror = utils.get_sheet_mirror()
+        with self._delete_lock:
+            targets = {}
+            for tab in ("simulations", "aportes"):
+                row_map = self._row_map(tab, mirror)
+                targets[tab] = [r for sid in ids for r in row_map.get(sid, [])]
+            if not targets["simulations"]: raise KeyError(", ".join(sorted(ids)))
+            requests = [req for tab, rows in targets.items() for req in self._delete_requests(self.worksheets[tab].id, rows)]
+            with perf.timed("gspread.batch_update", requests=len(requests)):
+                self.worksheets["simulations"].spreadsheet.batch_update({'requests': requests})
+            if mirror is not None:
+                for tab, rows in targets.items(): mirror.remove_rows(tab, rows)
+        return len(targets["simulations"])
+
+class SQLiteBackend(StorageBackend):
+    """Banco SQLite embutido, para rodar localmente sem a planilha."""
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS simulations ({', '.join(f'{c} {t}' for c, t in SIMULATION_COLUMNS)})")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS aportes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                simulation_id TEXT NOT NULL REFERENCES simulations(simulation_id) ON DELETE CASCADE,
+                data_aporte TEXT, valor_aporte REAL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_simulations_created_at ON simulations(created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_aportes_simulation_id ON aportes(simulation_id, data_aporte)")
+
+        self.store = DataStore(self._fetch, self._external_version)
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=params)
+        return utils.parse_sheet_frame(df)
+
+    def _fetch(self, tab):
+        if tab == "simulations":
+            return self._read("SELECT * FROM simulations ORDER BY rowid")
+        return self._read("SELECT simulation_id, data_aporte, valor_aporte FROM aportes ORDER BY id")
+
+    def _external_version(self):
+        # PRAGMA data_version só muda quando outra conexão (outro processo) grava no arquivo.
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write_simulations(self, items, progress):
+        placeholders = ", ".join("?" * len(SIMULATION_FIELDS))
+        with self._lock, self._conn:
+            self._conn.executemany(f"INSERT INTO simulations ({', '.join(SIMULATION_FIELDS)}) VALUES ({placeholders})", [row for row, _ in items])
+            self._conn.executemany("INSERT INTO aportes (simulation_id, data_aporte, valor_aporte) VALUES (?, ?, ?)", [a for _, rows in items for a in rows])
+
+    def _delete_simulations(self, ids):
+        params = [(sid,) for sid in ids]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM aportes WHERE simulation_id = ?", params)
+            deleted = self._conn.executemany("DELETE FROM simulations WHERE simulation_id = ?", params).rowcount
+            if not deleted: raise KeyError(", ".join(sorted(ids)))
+        return deleted
+
+def _configured_backend():
+    name = os.environ.get("SIMULADOR_STORAGE")
+    if not name:
+        try: name = st.secrets.get("storage_backend")
+        except Exception: name = None
+    return (name or "sheets").lower()
+
+@st.cache_resource
+def init_write_queue(_backend):
+    """Fila de gravação em segundo plano do backend, única no processo."""
+    return WriteQueue(_backend)
+
+@st.cache_resource
+def init_storage():
+    """Backend configurado por `SIMULADOR_STORAGE` ou `storage_backend` nos secrets (padrão: sheets)."""
+    if _configured_backend() == "sqlite":
+        return SQLiteBackend(os.environ.get("SIMULADOR_SQLITE_PATH", SQLITE_PATH))
+    worksheets = utils.init_gsheet_connection()
+    return SheetsBackend(worksheets) if worksheets else None
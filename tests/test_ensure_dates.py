@@ -0,0 +1,28 @@
+"""`ensure_dates` (lote) tem que dar as mesmas datas que `_ensure_date` (escalar)."""
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils  # noqa: E402
+
+SAO_PAULO = pd.Timestamp("2025-03-01 23:30", tz="America/Sao_Paulo")  # já é 02/03 em UTC
+
+CASES = {
+    "iso_e_date": ["2025-01-05", date(2025, 2, 2), pd.Timestamp("2025-06-01")],
+    "fuso_e_sem_fuso": [SAO_PAULO, "2025-01-05", date(2025, 2, 2)],
+    "sem_fuso_depois_fuso": ["2025-01-05", SAO_PAULO],
+    "timestamps_mistos": [pd.Timestamp("2025-03-01 23:30", tz="UTC"), pd.Timestamp("2025-03-01 23:30")],
+    "datetimes_mistos": [datetime(2025, 4, 1, 1, 0, tzinfo=timezone(timedelta(hours=9))), datetime(2025, 4, 1)],
+    "todos_com_fuso": [SAO_PAULO, SAO_PAULO],
+    "string_com_offset": ["2025-05-01T23:00:00-03:00", "2025-01-05", "01/02/2025"],
+    "vazios_e_invalidos": ["2025-01-05", "31/12/2024", "", None, "lixo"],
+}
+
+@pytest.mark.parametrize("values", CASES.values(), ids=CASES.keys())
+def test_ensure_dates_matches_scalar(values):
+    expected = [utils._ensure_date(v) for v in values]
+    assert [d.item() for d in utils.ensure_dates(values)] == expected
@@ -2,13 +2,13 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import os
 import utils
+import risk
 from dateutil.relativedelta import relativedelta
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
 import plotly.express as px
-from utils import format_currency, calculate_financials
-import scipy
+from utils import format_currency
 
 THEME_PRIMARY_COLOR = "#E37026"
 
@@ -50,8 +50,8 @@ def display_full_results(results, show_save_button=False, show_download_button=F
         if aportes_list:
             try:
                 df_aportes_display = pd.DataFrame([{'Vencimento': a['date'], 'Valor': a['value']} for a in aportes_list])
-                df_aportes_display['Vencimento'] = pd.to_datetime(df_aportes_display['Vencimento']).dt.strftime('%d/%m/%Y')
-                df_aportes_display['Valor'] = df_aportes_display['Valor'].apply(utils.format_currency)
+                df_aportes_display['Vencimento'] = utils.format_date(df_aportes_display['Vencimento'])
+                df_aportes_display['Valor'] = utils.format_brl(df_aportes_display['Valor'])
                 st.dataframe(df_aportes_display, use_container_width=True, hide_index=True)
             except Exception:
                 st.warning("Erro ao exibir tabela de aportes.")
@@ -177,21 +177,15 @@ def display_full_results(results, show_save_button=False, show_download_button=F
 
     with tab_sensibilidade:
         st.subheader("Matriz de Cenários")
-        base_params = results.copy()
-        scenarios = {}
-        
         try:
-            scenarios['Realista'] = calculate_financials(base_params)
-            
-            pessimistic = base_params.copy()
-            pessimistic['value_m2'] *= 0.85
-            pessimistic['construction_cost_m2'] *= 1.15
-            scenarios['Pessimista'] = calculate_financials(pessimistic)
-            
-            optimistic = base_params.copy()
-            optimistic['value_m2'] *= 1.15
-            optimistic['construction_cost_m2'] *= 0.85
-            scenarios['Otimista'] = calculate_financials(optimistic)
+            base_val = results.get('value_m2', 0)
+            base_cost = results.get('construction_cost_m2', 0)
+            df_scen = utils.calculate_financials_batch({
+                'value_m2': [base_val * 0.85, base_val * 1.15],
+                'construction_cost_m2': [base_cost * 1.15, base_cost * 0.85],
+            }, base=results)
+            scenarios = dict(zip(['Pessimista', 'Otimista'], df_scen.to_dict('records')))
+            scenarios['Realista'] = results
 
             c_pess, c_real, c_opt = st.columns(3)
             
@@ -220,12 +214,11 @@ def display_full_results(results, show_save_button=False, show_download_button=F
             variacao_custo = st.slider("Variação do Custo da Obra (%)", -25.0, 25.0, 0.0, 0.5)
         
         with col_res_sim:
-            sim_params = results.copy()
-            sim_params['value_m2'] = sim_params['value_m2'] * (1 + variacao_vgv/100)
-            sim_params['construction_cost_m2'] = sim_params['construction_cost_m2'] * (1 + variacao_custo/100)
-            
             try:
-                cenario_simulado = calculate_financials(sim_params)
+                cenario_simulado = utils.calculate_financials_batch({
+                    'value_m2': [results.get('value_m2', 0) * (1 + variacao_vgv/100)],
+                    'construction_cost_m2': [results.get('construction_cost_m2', 0) * (1 + variacao_custo/100)],
+                }, base=results).iloc[0]
                 roi_sim = cenario_simulado.get('roi_anualizado', 0)
                 lucro_sim = cenario_simulado.get('resultado_final_investidor', 0)
                 
@@ -242,49 +235,106 @@ def display_full_results(results, show_save_button=False, show_download_button=F
             except Exception as e:
                 st.error(f"Erro: {e}")
 
+        st.divider()
+        st.subheader("Simulação de Monte Carlo")
+        with st.form(f"mc_form_{unique_id}"):
+            m1, m2, m3 = st.columns(3)
+            n_paths = m1.select_slider("Caminhos", options=[10_000, 100_000, 250_000, 500_000, 1_000_000], value=100_000)
+            mc_seed = m2.number_input("Semente", min_value=0, value=42, step=1)
+            use_pool = m3.toggle("Pool de processos", value=False, help="Distribui os blocos de caminhos entre processos.")
+            d1, d2, d3, d4 = st.columns(4)
+            price_sd = d1.slider("Desvio Valor de Venda (%)", 0.0, 30.0, 10.0, 0.5)
+            cost_high = d2.slider("Estouro Máx. Custo (%)", 0.0, 50.0, 25.0, 1.0)
+            exchange_sd = d3.slider("Desvio Permuta (p.p.)", 0.0, 10.0, 2.0, 0.5)
+            delay_months = d4.slider("Atraso Máx. (meses)", 0, 24, 12, 1)
+            run_mc = st.form_submit_button("Executar Simulação", use_container_width=True)
+
+        mc_key = f"mc_result_{unique_id}"
+        if run_mc:
+            with st.spinner("Simulando caminhos..."):
+                st.session_state[mc_key] = risk.compact(risk.run_monte_carlo(
+                    results, n_paths=int(n_paths), seed=int(mc_seed), workers=os.cpu_count() if use_pool else None,
+                    price_sd=price_sd / 100, cost_high=cost_high / 100, exchange_sd=exchange_sd,
+                    delay_max_days=int(delay_months * 30.4)
+                ))
+
+        mc = st.session_state.get(mc_key)
+        if mc:
+            sm = mc['summary']
+            r1, r2, r3, r4 = st.columns(4)
+            r1.metric("ROI a.a. P5", f"{sm['roi_p5']:.2f}%")
+            r2.metric("ROI a.a. P50", f"{sm['roi_p50']:.2f}%")
+            r3.metric("ROI a.a. P95", f"{sm['roi_p95']:.2f}%")
+            r4.metric("Prob. de Prejuízo", f"{sm['prob_loss'] * 100:.2f}%")
+            l1, l2, l3 = st.columns(3)
+            l1.metric("Lucro P5", format_currency(sm['lucro_p5']))
+            l2.metric("Lucro P50", format_currency(sm['lucro_p50']))
+            l3.metric("Lucro P95", format_currency(sm['lucro_p95']))
+
+            edges = mc['hist_edges']
+            centers = (edges[:-1] + edges[1:]) / 2
+            fig_mc = go.Figure(go.Bar(
+                x=centers, y=mc['hist_share'] * 100,
+                marker_color=np.where(centers < 0, '#D32F2F', THEME_PRIMARY_COLOR),
+                hovertemplate="Lucro: R$ %{x:,.0f}<br>%{y:.2f}% dos caminhos<extra></extra>"
+            ))
+            for q, label in [('lucro_p5', 'P5'), ('lucro_p50', 'P50'), ('lucro_p95', 'P95')]:
+                fig_mc.add_vline(x=sm[q], line_dash="dot", line_color="white", annotation_text=label)
+            fig_mc.update_layout(
+                title=f"Distribuição do Lucro ({mc['n_paths']:,} caminhos, semente {mc['seed']})",
+                xaxis_title="Lucro Líquido (R$)", yaxis_title="% dos caminhos", bargap=0.02,
+                paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font={'color': 'white'}
+            )
+            st.plotly_chart(fig_mc, use_container_width=True)
+
         st.write("")
         with st.expander("Mapa de Calor de Sensibilidade", expanded=True):
-            try:
-                base_cost = results.get('construction_cost_m2', 0)
-                base_val = results.get('value_m2', 0)
-                
-                costs = np.linspace(base_cost * 0.8, base_cost * 1.2, 5)
-                values = np.linspace(base_val * 0.8, base_val * 1.2, 5)
-                
-                z_data = []
-                for c in costs:
-                    row_z = []
-                    for v in values:
-                        p = results.copy()
-                        p['construction_cost_m2'] = c
-                        p['value_m2'] = v
-                        r = calculate_financials(p)
-                        row_z.append(r['roi_anualizado'])
-                    z_data.append(row_z)
+            axis_keys = list(utils.SENSITIVITY_AXES)
+            h1, h2, h3, h4 = st.columns(4)
+            x_key = h1.selectbox("Eixo X", axis_keys, index=axis_keys.index('value_m2'), format_func=utils.SENSITIVITY_AXES.get)
+            y_key = h2.selectbox("Eixo Y", axis_keys, index=axis_keys.index('construction_cost_m2'), format_func=utils.SENSITIVITY_AXES.get)
+            resolution = h3.select_slider("Resolução", options=[5, 25, 50, 100, 200], value=100)
+            span = h4.slider("Amplitude (±%)", 5, 50, 20, 5) / 100
+
+            if x_key == y_key:
+                st.warning("Selecione parâmetros diferentes para os eixos.")
+            else:
+                try:
+                    x_label, y_label = utils.SENSITIVITY_AXES[x_key], utils.SENSITIVITY_AXES[y_key]
+                    def axis_ticks(key, values):
+                        ticks = utils.sensitivity_ticks(key, values)
+                        return {'tickvals': ticks[0], 'ticktext': ticks[1]} if ticks else {}
+                    xs, ys, z_data = utils.sensitivity_surface(results, x_key, y_key, resolution=resolution, span=span)
                 
-                fig_heat = px.imshow(
-                    z_data,
-                    x=[format_currency(v) for v in values],
-                    y=[format_currency(c) for c in costs],
-                    text_auto='.1f',
-                    aspect="auto",
-                    labels=dict(x="Valor de Venda (R$/m²)", y="Custo de Obra (R$/m²)", color="ROI %"),
-                    color_continuous_scale='Magma'
-                )
+                    fig_heat = go.Figure(go.Heatmap(
+                        z=z_data, x=xs, y=ys,
+                        colorscale='Magma',
+                        colorbar={'title': 'ROI %'},
+                        texttemplate='%{z:.1f}' if resolution <= 10 else None,
+                        hovertemplate=f"{x_label}: %{{x:,.2f}}<br>{y_label}: %{{y:,.2f}}<br>ROI: %{{z:.2f}}%<extra></extra>"
+                    ))
+                    if np.nanmin(z_data) < 0 < np.nanmax(z_data):
+                        fig_heat.add_trace(go.Contour(
+                            z=z_data, x=xs, y=ys,
+                            contours={'start': 0, 'end': 0, 'size': 1, 'coloring': 'lines', 'showlabels': True},
+                            colorscale=[[0, 'white'], [1, 'white']],
+                            line={'width': 2, 'dash': 'dash'},
+                            showscale=False, hoverinfo='skip', name="Break-even (ROI = 0)"
+                        ))
                 
-                fig_heat.update_layout(
-                    title={'text': "ROI Anualizado (%)", 'font': {'color': 'white'}},
-                    xaxis={'title': 'Valor de Venda (R$/m²)', 'tickfont': {'color': 'white'}},
-                    yaxis={'title': 'Custo de Obra (R$/m²)', 'tickfont': {'color': 'white'}},
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    height=400,
-                    font={'color': 'white'}
-                )
-                st.plotly_chart(fig_heat, use_container_width=True)
+                    fig_heat.update_layout(
+                        title={'text': "ROI Anualizado (%)", 'font': {'color': 'white'}},
+                        xaxis={'title': x_label, 'tickfont': {'color': 'white'}, **axis_ticks(x_key, xs)},
+                        yaxis={'title': y_label, 'tickfont': {'color': 'white'}, **axis_ticks(y_key, ys)},
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        height=450,
+                        font={'color': 'white'}
+                    )
+                    st.plotly_chart(fig_heat, use_container_width=True)
 
-            except Exception as e:
-                 st.error(f"Não foi possível gerar o mapa de calor: {e}")
+                except Exception as e:
+                    st.error(f"Não foi possível gerar o mapa de calor: {e}")
                 
     buttons_to_show = []
     if show_download_button: buttons_to_show.append("download")
@@ -300,15 +350,15 @@ def display_full_results(results, show_save_button=False, show_download_button=F
                 can_download = is_simulation_saved or results.get('simulation_id', '').startswith('sim_')
                 
                 pdf_data = results.copy()
-                pdf_data['aportes'] = results.get('aportes', []) 
-                pdf_bytes = utils.generate_pdf(pdf_data)
+                pdf_data['aportes'] = list(results.get('aportes', []))
+                pdf_cache = utils.get_pdf_cache()
                 
                 client_name_safe = "".join(c for c in results.get('client_name', 'simulacao') if c.isalnum() or c in (' ', '_')).rstrip().replace(' ', '_').lower()
                 file_name = f"relatorio_{client_name_safe}_{datetime.now().strftime('%Y%m%d')}.pdf"
 
                 st.download_button(
                     label="Baixar Relatório PDF",
-                    data=pdf_bytes,
+                    data=lambda: utils.generate_pdf_cached(pdf_data, pdf_cache),  # gerado só no clique
                     file_name=file_name,
                     mime="application/pdf",
                     use_container_width=True,
@@ -1,26 +1,78 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
-import locale
-import io
 import streamlit as st
-from fpdf import FPDF
-import gspread
-from gspread.exceptions import SpreadsheetNotFound
-import os
+import perf
+import math
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except locale.Error:
-    locale.setlocale(locale.LC_ALL, '')
+def _like(values, out):
+    """Devolve `out` no mesmo formato da entrada: Series (mesmo índice) ou array."""
+    if isinstance(values, pd.Series): return pd.Series(out, index=values.index, dtype=object)
+    return out
+
+def _fixed_point(values, decimals):
+    """Partes de um número em ponto fixo: (valores, ausentes, negativos, parte inteira, casas decimais em texto)."""
+    v = pd.to_numeric(values if isinstance(values, pd.Series) else pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    missing = ~np.isfinite(v)
+    scale = 10 ** decimals
+    units = np.rint(np.abs(np.where(missing, 0, v)) * scale).astype(np.int64)
+    n, frac = np.divmod(units, scale)
+    negative = (v < 0) & (units > 0)  # "-0,00" não existe
+    return missing, negative, n, pc.utf8_lpad(pa.array(frac).cast(pa.string()), decimals, '0')
+
+def format_brl(values, decimals=2):
+    """Valores em reais ("R$ 1.234,56", "-R$ 10,00") para uma coluna inteira, sem depender de `locale`.
+
+    Os grupos de milhar são montados com kernels do pyarrow; NaN/None viram "N/A".
+    """
+    missing, negative, n, frac = _fixed_point(values, decimals)
+    groups, k = [], 0
+    while k == 0 or (n >= 1000 ** k).any():
+        unit = 1000 ** k
+        g = pa.array((n // unit) % 1000).cast(pa.string())
+        g = pc.if_else(pa.array(n >= unit * 1000), pc.utf8_lpad(g, 3, '0'), g)  # grupos internos com 3 dígitos
+        groups.append(g if k == 0 else pc.if_else(pa.array(n >= unit), g, pa.nulls(len(n), pa.string())))
+        k += 1
+    integer = pc.binary_join_element_wise(*reversed(groups), '.', null_handling='skip')
+    sign = pa.array(np.where(negative, '-R$ ', 'R$ '))
+    out = pc.binary_join_element_wise(sign, integer, ',', frac, '') if decimals else pc.binary_join_element_wise(sign, integer, '')
+    out = pc.if_else(pa.array(missing), pa.scalar('N/A'), out)
+    return _like(values, out.to_numpy(zero_copy_only=False))
+
+def format_percent(values, decimals=2):
+    """Percentuais no padrão já usado nas telas ("12.50%", sem separador de milhar); NaN/None viram "N/A"."""
+    missing, negative, n, frac = _fixed_point(values, decimals)
+    sign = pa.array(np.where(negative, '-', ''))
+    integer = pa.array(n).cast(pa.string())
+    out = pc.binary_join_element_wise(sign, integer, '.', frac, '%', '') if decimals else pc.binary_join_element_wise(sign, integer, '%', '')
+    out = pc.if_else(pa.array(missing), pa.scalar('N/A'), out)
+    return _like(values, out.to_numpy(zero_copy_only=False))
+
+def format_date(values, fmt="%d/%m/%Y"):
+    """Datas como texto ("31/12/2025") para uma coluna inteira; valores inválidos viram ""."""
+    ts = pd.to_datetime(pd.Series(values) if not isinstance(values, pd.Series) else values, errors='coerce')
+    out = pc.fill_null(pc.strftime(pa.array(ts.to_numpy(dtype='datetime64[us]'), mask=ts.isna().to_numpy()), format=fmt), '')
+    return _like(values, out.to_numpy(zero_copy_only=False))
 
 def format_currency(value):
+    """Um valor em reais, mesmo resultado de `format_brl` sem o custo de montar arrays por chamada."""
     if value is None: return "N/A"
     try:
-        return locale.currency(float(value), grouping=True, symbol='R$')
-    except:
+        v = float(value)
+    except (TypeError, ValueError):
         return f"R$ {value}"
+    if not math.isfinite(v): return "N/A"
+    n, frac = divmod(round(abs(v) * 100), 100)  # round() arredonda como np.rint em _fixed_point
+    sign = "-" if v < 0 and (n or frac) else ""
+    return f"{sign}R$ {n:,}".replace(",", ".") + f",{frac:02d}"
 
 def _ensure_date(val):
     """Converte qualquer coisa (String, Timestamp, Datetime) para datetime.date (Python Puro)."""
@@ -37,24 +89,68 @@ def _ensure_date(val):
     except:
         return date.today()
 
+def ensure_dates(values):
+    """Versão em lote de `_ensure_date`: lista/Series de strings, Timestamps e dates -> array datetime64[D].
+
+    Mesmas regras do escalar: vazios e valores inválidos viram a data de hoje. ISO e objetos de
+    data são convertidos de uma vez; só as strings restantes (ex.: "01/02/2025") passam pelo
+    parser genérico, uma vez por valor distinto.
+    """
+    if not isinstance(values, pd.Series):
+        values = list(values)
+        if all(type(v) is date for v in values):
+            return np.array(values, dtype='datetime64[D]')
+        values = pd.Series(values, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        ts = values.dt.tz_localize(None) if values.dt.tz else values
+    else:
+        try: ts = pd.to_datetime(values, errors='coerce', format='ISO8601')
+        except ValueError: ts = None  # fusos diferentes entre os valores
+        if ts is None or ts.dt.tz is not None or any(getattr(v, 'tzinfo', None) is not None for v in values[ts.isna()]):
+            # Valor com fuso vale pela data local dele, como em `_ensure_date` (nem NaT, nem UTC).
+            values = values.map(_wall_time)
+            ts = pd.to_datetime(values, errors='coerce', format='ISO8601')
+        pending = ts.isna().to_numpy() & values.map(lambda v: isinstance(v, str) and v.strip() != '').to_numpy()
+        if pending.any():
+            rest = values[pending]
+            parsed = {v: _parse_date_or_nat(v) for v in rest.unique()}
+            ts = ts.copy()
+            ts.iloc[np.flatnonzero(pending)] = rest.map(parsed).to_numpy()
+    out = ts.to_numpy(dtype='datetime64[D]').copy()
+    out[np.isnat(out)] = np.datetime64(date.today(), 'D')
+    return out
+
+def _parse_date_or_nat(text):
+    try: return pd.to_datetime(text)
+    except (ValueError, TypeError, OverflowError): return pd.NaT
+
+def _wall_time(v):
+    """Tira o fuso mantendo a data/hora local; valores sem fuso passam intactos."""
+    if isinstance(v, str):
+        ts = _parse_date_or_nat(v) if v.strip() else pd.NaT
+        return ts.tz_localize(None) if not pd.isna(ts) and ts.tz is not None else v
+    return v.replace(tzinfo=None) if getattr(v, 'tzinfo', None) is not None else v
+
 @st.cache_resource
 def init_gsheet_connection():
+    import gspread  # importado só após o login, quando o armazenamento é aberto
+    from gspread.exceptions import SpreadsheetNotFound
     try:
         creds_dict = dict(st.secrets["gcp_service_account"])
         if "private_key" in creds_dict:
             creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
 
-        gc = gspread.service_account_from_dict(creds_dict)
-        
         if "spreadsheet_key" not in st.secrets: 
             st.error("Chave da planilha não encontrada nos secrets.")
             return None
             
-        sh = gc.open_by_key(st.secrets["spreadsheet_key"])
-        return {
-            "simulations": sh.worksheet("simulations"), 
-            "aportes": sh.worksheet("aportes")
-        }
+        with perf.timed("gspread.connect"):
+            gc = gspread.service_account_from_dict(creds_dict)
+            sh = gc.open_by_key(st.secrets["spreadsheet_key"])
+            return {
+                "simulations": sh.worksheet("simulations"), 
+                "aportes": sh.worksheet("aportes")
+            }
     except SpreadsheetNotFound:
         st.error("Planilha não encontrada. Verifique se o ID está correto e se o email de serviço tem permissão de editor.")
         return None
@@ -62,116 +158,392 @@ def init_gsheet_connection():
         st.error(f"Erro GSheets: {e}")
         return None
 
-@st.cache_data(ttl=60)
-def load_data_from_sheet(_worksheet, tab_name="default"):
+NUMERIC_COLUMNS = ['total_contribution', 'num_months', 'annual_interest_rate', 'spe_percentage',
+                   'land_size', 'construction_cost_m2', 'value_m2', 'area_exchange_percentage',
+                   'vgv', 'total_construction_cost', 'final_operational_result', 'valor_participacao',
+                   'resultado_final_investidor', 'roi', 'roi_anualizado', 'valor_corrigido',
+                   'valor_aporte', 'cost_obra_fisica', 'juros_investidor']
+DATE_COLUMNS = ['created_at', 'start_date', 'project_end_date', 'data_aporte']
+SHEET_SCHEMA = {**dict.fromkeys(NUMERIC_COLUMNS, 'float64'), **dict.fromkeys(DATE_COLUMNS, 'datetime64')}
+
+# Datas com barras são lidas primeiro como dd/mm/aaaa (planilha em pt-BR); mm/dd/aaaa só quando isso falha.
+SHEET_DAYFIRST = True
+
+def _as_arrow_strings(s):
+    arr = s.astype(str).array
+    if hasattr(arr, '__arrow_array__'):
+        arr = pa.array(arr)
+    else:
+        arr = pa.array(np.asarray(arr, dtype=object), type=pa.string(), from_pandas=True)
+    if isinstance(arr, pa.ChunkedArray): arr = arr.combine_chunks()
+    return pc.utf8_trim_whitespace(arr)
+
+def _parse_numbers(s):
+    """Texto BR ('R$ 1.234,56') ou US ('1,234.56') para float64; vazios e inválidos viram 0.
+
+    A regra é por valor: se a última vírgula vem depois do último ponto, a vírgula é decimal.
+    """
+    a = pc.utf8_trim_whitespace(pc.utf8_rtrim(pc.replace_substring(_as_arrow_strings(s), 'R$', ''), '%'))
+    rev = pc.utf8_reverse(a)
+    last_comma, last_dot = pc.find_substring(rev, ','), pc.find_substring(rev, '.')
+    comma_decimal = pc.and_(pc.not_equal(last_comma, -1), pc.or_(pc.equal(last_dot, -1), pc.less(last_comma, last_dot)))
+    dots_are_thousands = pc.or_(comma_decimal, pc.greater(pc.count_substring(a, '.'), 1))
+    a = pc.if_else(dots_are_thousands, pc.replace_substring(a, '.', ''), a)
+    a = pc.if_else(comma_decimal, pc.replace_substring(a, ',', '.'), pc.replace_substring(a, ',', ''))
+    a = pc.fill_null(pc.if_else(pc.equal(a, ''), '0', a), '0')
     try:
-        if _worksheet is None: return pd.DataFrame()
-        vals = _worksheet.get_all_values()
-        if not vals: return pd.DataFrame()
-        
-        df = pd.DataFrame(vals[1:], columns=vals[0])
-        
-        df = df.loc[:, df.columns.notna()]
-        df = df.loc[:, [c for c in df.columns if c != '']]
-        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-        
-        rename_map = {'date': 'data_aporte', 'value': 'valor_aporte', 'data': 'data_aporte', 'valor': 'valor_aporte'}
-        df.rename(columns=rename_map, inplace=True)
-        
-        if 'row_index' not in df.columns:
-            df['row_index'] = [i + 2 for i in range(len(df))]
-
-        cols_num = ['total_contribution', 'num_months', 'annual_interest_rate', 'spe_percentage',
-                    'land_size', 'construction_cost_m2', 'value_m2', 'area_exchange_percentage',
-                    'vgv', 'total_construction_cost', 'final_operational_result', 'valor_participacao',
-                    'resultado_final_investidor', 'roi', 'roi_anualizado', 'valor_corrigido',
-                    'valor_aporte', 'cost_obra_fisica', 'juros_investidor']
-        
-        for c in cols_num:
-            if c in df.columns:
-                s = df[c].astype(str).str.replace('R$', '', regex=False).str.strip()
-                is_br = s.str.contains(',', na=False)
-                s.loc[is_br] = s.loc[is_br].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
-                df[c] = pd.to_numeric(s, errors='coerce').fillna(0)
-        
-        return df
+        out = pc.cast(a, pa.float64())
+    except pa.ArrowInvalid:
+        valid = pc.match_substring_regex(a, r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+        out = pc.cast(pc.if_else(valid, a, '0'), pa.float64())
+    return pd.Series(out.to_numpy(zero_copy_only=False), index=s.index)
+
+def _parse_dates(s, dayfirst=SHEET_DAYFIRST):
+    """ISO ('2025-01-31 10:00:00') ou com barras ('31/01/2025 10:00') para datetime64; inválidos viram NaT."""
+    out = pd.to_datetime(s.astype(str).str.strip(), format='ISO8601', errors='coerce')
+    day_month = ['%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y']
+    month_day = [f.replace('%d/%m', '%m/%d') for f in day_month]
+    pending = out.isna().to_numpy().copy()
+    for fmt in (day_month + month_day) if dayfirst else (month_day + day_month):
+        if not pending.any(): break
+        rows = np.flatnonzero(pending)
+        parsed = pc.strptime(_as_arrow_strings(s.iloc[rows]), format=fmt, unit='s', error_is_null=True)
+        parsed = pd.to_datetime(parsed.to_numpy(zero_copy_only=False))
+        ok = parsed.notna()
+        out.iloc[rows[ok]] = parsed[ok]
+        pending[rows[ok]] = False
+    return out
+
+def parse_sheet_frame(df, schema=SHEET_SCHEMA):
+    """Converte as colunas do schema para float64/datetime64.
+
+    As colunas numéricas em texto são empilhadas e convertidas numa única passada vetorizada.
+    """
+    num_cols = [c for c in df.columns if schema.get(c) == 'float64']
+    text_cols = [c for c in num_cols if not pd.api.types.is_numeric_dtype(df[c])]
+    for c in num_cols:
+        if c not in text_cols: df[c] = df[c].fillna(0).astype('float64')
+    if text_cols and len(df):
+        stacked = pd.concat([df[c] for c in text_cols], ignore_index=True)
+        parsed = _parse_numbers(stacked).to_numpy().reshape(len(text_cols), len(df))
+        for c, v in zip(text_cols, parsed): df[c] = v
+
+    for c in df.columns:
+        if schema.get(c) == 'datetime64' and not pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = _parse_dates(df[c])
+    return df
+
+@st.cache_resource
+def get_sheet_mirror():
+    from sheet_mirror import SheetMirror
+    try:
+        return SheetMirror()
     except Exception as e:
-        st.error(f"Erro load ({tab_name}): {e}")
-        return pd.DataFrame()
+        print(f"Espelho local indisponível: {e}")
+        return None
 
-def calculate_financials(params):
-    results = {}
-    results.update(params)
-    dt_start = _ensure_date(params.get('start_date'))
-    dt_end = _ensure_date(params.get('project_end_date'))
+def _read_worksheet_values(worksheet, tab_name):
+    """Lê a aba pelo espelho local, baixando da planilha apenas as linhas novas."""
+    mirror = get_sheet_mirror()
+    if mirror is None:
+        with perf.timed("gspread.get_all_values", tab=tab_name): vals = worksheet.get_all_values()
+        perf.count(f"sheet.rows_fetched.{tab_name}", max(len(vals) - 1, 0))
+        return vals
+    try:
+        with perf.timed("gspread.sync", tab=tab_name): fetched = mirror.sync(worksheet, tab_name)
+        perf.count(f"sheet.rows_fetched.{tab_name}", fetched)
+    except Exception as e:
+        st.warning(f"Usando cópia local de '{tab_name}': falha ao sincronizar ({e}).")
+    return mirror.load(tab_name)
+
+def read_sheet_frame(worksheet, tab_name="default"):
+    """Aba como DataFrame tipado (lida pelo espelho local); erros sobem para quem chamou."""
+    with perf.timed(f"read_sheet_frame.{tab_name}"):
+        return _read_sheet_frame(worksheet, tab_name)
+
+def _read_sheet_frame(worksheet, tab_name):
+    if worksheet is None: return pd.DataFrame()
+    vals = _read_worksheet_values(worksheet, tab_name)
+    if not vals: return pd.DataFrame()
     
-    aportes = params.get('aportes', [])
-    total_contribution = 0
-    total_montante = 0
+    df = pd.DataFrame(vals[1:], columns=vals[0])
     
-    annual_rate = params.get('annual_interest_rate', 0) / 100
-    daily_rate = (1 + annual_rate) ** (1/365) - 1
+    df = df.loc[:, df.columns.notna()]
+    df = df.loc[:, [c for c in df.columns if c != '']]
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+    
+    rename_map = {'date': 'data_aporte', 'value': 'valor_aporte', 'data': 'data_aporte', 'valor': 'valor_aporte'}
+    df.rename(columns=rename_map, inplace=True)
     
+    if 'row_index' not in df.columns:
+        df['row_index'] = [i + 2 for i in range(len(df))]
+
+    return parse_sheet_frame(df)
+
+RESULT_COLUMNS = ['total_contribution', 'valor_corrigido', 'juros_investidor', 'num_months', 'total_days_for_roi',
+                  'vgv', 'cost_obra_fisica', 'area_exchange_value', 'total_construction_cost',
+                  'final_operational_result', 'valor_participacao', 'resultado_final_investidor',
+                  'roi', 'roi_anualizado']
+
+PROJECT_INPUTS = ['land_size', 'value_m2', 'construction_cost_m2', 'area_exchange_percentage', 'spe_percentage']
+
+def _schedule_arrays(aportes):
+    """Converte a lista de aportes em arrays ordenados de datas (datetime64[D]) e valores (float64)."""
     if not aportes:
-        days_roi = 1
-        months_roi = 1
-    else:
-        sorted_aps = sorted(aportes, key=lambda x: _ensure_date(x.get('date', x.get('data'))))
-        dt_first_ap = _ensure_date(sorted_aps[0].get('date', sorted_aps[0].get('data')))
-        
-        days_roi = max(1, (dt_end - dt_first_ap).days)
-        
-        rd = relativedelta(dt_end, dt_first_ap)
-        months_roi = max(1, rd.years * 12 + rd.months)
-        
-        for ap in sorted_aps:
-            dt_ap = _ensure_date(ap.get('date', ap.get('data')))
-            val = float(ap.get('value', ap.get('valor', 0)))
-            total_contribution += val
-            
-            days_active = (dt_end - dt_ap).days
-            if days_active > 0:
-                total_montante += val * ((1 + daily_rate) ** days_active)
-            else:
-                total_montante += val
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=float)
+    dates = ensure_dates([ap.get('date', ap.get('data')) for ap in aportes])
+    values = np.array([float(ap.get('value', ap.get('valor', 0))) for ap in aportes], dtype=float)
+    order = np.argsort(dates, kind='stable')
+    return dates[order], values[order]
 
-    juros = max(0, total_montante - total_contribution)
+def _schedule_stage(aportes, dt_end, annual_interest_rate):
+    """Parte dos juros: depende apenas do cronograma, da taxa e da data de término.
+
+    `aportes` pode ser a lista de dicts ou a tupla (datas, valores) de `_schedule_arrays`.
+    """
+    dates, values = aportes if isinstance(aportes, tuple) else _schedule_arrays(aportes)
     
-    results['valor_corrigido'] = total_montante
-    results['total_contribution'] = total_contribution
-    results['num_months'] = months_roi
-    results['total_days_for_roi'] = days_roi
-    results['start_date'] = dt_start
-    results['project_end_date'] = dt_end
-    results['juros_investidor'] = juros
+    annual_rate = annual_interest_rate / 100
+    daily_rate = (1 + annual_rate) ** (1/365) - 1
     
-    vgv = params.get('land_size', 0) * params.get('value_m2', 0)
-    custo_obra = params.get('land_size', 0) * params.get('construction_cost_m2', 0)
-    permuta = vgv * (params.get('area_exchange_percentage', 0) / 100)
+    if len(dates) == 0:
+        return {
+            'total_contribution': 0, 'valor_corrigido': 0, 'juros_investidor': 0,
+            'num_months': 1, 'total_days_for_roi': 1,
+        }
+
+    dt_first_ap = dates[0].astype(object)
+    days_roi = max(1, (dt_end - dt_first_ap).days)
+    
+    rd = relativedelta(dt_end, dt_first_ap)
+    months_roi = max(1, rd.years * 12 + rd.months)
+    
+    days_active = (np.datetime64(dt_end, 'D') - dates).astype(np.int64)
+    growth = np.where(days_active > 0, (1 + daily_rate) ** np.maximum(days_active, 0), 1.0)
+    total_contribution = float(values.sum())
+    total_montante = float((values * growth).sum())
+
+    return {
+        'total_contribution': total_contribution,
+        'valor_corrigido': total_montante,
+        'juros_investidor': max(0, total_montante - total_contribution),
+        'num_months': months_roi,
+        'total_days_for_roi': days_roi,
+    }
+
+def _schedule_key(aportes):
+    """Chave imutável (data, valor) do cronograma, usada pelos caches da etapa de juros."""
+    return tuple((ap.get('date', ap.get('data')), float(ap.get('value', ap.get('valor', 0)))) for ap in aportes or [])
+
+@functools.lru_cache(maxsize=64)
+def _cached_schedule_arrays(schedule_key):
+    return _schedule_arrays([{'date': d, 'value': v} for d, v in schedule_key])
+
+@functools.lru_cache(maxsize=1024)
+def _cached_schedule_stage(schedule_key, dt_end, annual_interest_rate):
+    return _schedule_stage(_cached_schedule_arrays(schedule_key), dt_end, annual_interest_rate)
+
+def schedule_stage(aportes, dt_end, annual_interest_rate):
+    """Etapa do cronograma com cache: só recompõe os aportes quando o cronograma, a taxa ou o término mudam.
+
+    O dict devolvido é compartilhado pelo cache e não deve ser alterado.
+    """
+    return _cached_schedule_stage(_schedule_key(aportes), _ensure_date(dt_end), float(annual_interest_rate))
+
+def _project_stage(sched, land_size, value_m2, construction_cost_m2, area_exchange_percentage, spe_percentage):
+    """Parte do projeto: aceita escalares ou arrays NumPy (um cenário por posição)."""
+    total_contribution = np.asarray(sched['total_contribution'], dtype=float)
+    total_montante = np.asarray(sched['valor_corrigido'], dtype=float)
+    juros = np.asarray(sched['juros_investidor'], dtype=float)
+    days_roi = np.asarray(sched['total_days_for_roi'], dtype=float)
+
+    vgv = np.asarray(land_size, dtype=float) * value_m2
+    custo_obra = np.asarray(land_size, dtype=float) * construction_cost_m2
+    permuta = vgv * (np.asarray(area_exchange_percentage, dtype=float) / 100)
     custo_total = custo_obra + juros + permuta
     res_operacional = vgv - custo_total
     
-    part_spe = res_operacional * (params.get('spe_percentage', 0) / 100)
+    part_spe = res_operacional * (np.asarray(spe_percentage, dtype=float) / 100)
     lucro_investidor = (total_montante + part_spe) - total_contribution
     
-    if total_contribution > 0:
-        roi_abs = lucro_investidor / total_contribution
-        if (1 + roi_abs) > 0:
-            roi_aa = ((1 + roi_abs) ** (365 / days_roi)) - 1
-        else:
-            roi_aa = -1
-    else:
-        roi_abs, roi_aa = 0, 0
+    has_contribution = total_contribution > 0
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        roi_abs = np.where(has_contribution, lucro_investidor / np.where(has_contribution, total_contribution, 1), 0.0)
+        base = 1 + roi_abs
+        roi_aa = np.where(base > 0, np.power(np.where(base > 0, base, 1), 365 / days_roi) - 1, -1.0)
+    roi_aa = np.where(has_contribution, roi_aa, 0.0)
 
-    results.update({
+    return {
         'vgv': vgv, 'cost_obra_fisica': custo_obra, 'area_exchange_value': permuta,
         'total_construction_cost': custo_total, 'final_operational_result': res_operacional,
         'valor_participacao': part_spe, 'resultado_final_investidor': lucro_investidor,
-        'roi': round(roi_abs * 100, 2), 'roi_anualizado': round(roi_aa * 100, 2)
-    })
+        'roi': np.round(roi_abs * 100, 2), 'roi_anualizado': np.round(roi_aa * 100, 2)
+    }
+
+@perf.timed("calculate_financials")
+def calculate_financials(params):
+    results = {}
+    results.update(params)
+    dt_start = _ensure_date(params.get('start_date'))
+    dt_end = _ensure_date(params.get('project_end_date'))
+    
+    sched = schedule_stage(params.get('aportes', []), dt_end, params.get('annual_interest_rate', 0))
+    
+    results['valor_corrigido'] = sched['valor_corrigido']
+    results['total_contribution'] = sched['total_contribution']
+    results['num_months'] = sched['num_months']
+    results['total_days_for_roi'] = sched['total_days_for_roi']
+    results['start_date'] = dt_start
+    results['project_end_date'] = dt_end
+    results['juros_investidor'] = sched['juros_investidor']
+    
+    proj = _project_stage(sched, *(params.get(k, 0) for k in PROJECT_INPUTS))
+    results.update({k: float(v) for k, v in proj.items()})
     
     return results
 
+def calculate_financials_batch(params, aportes=None, base=None):
+    """Avalia vários cenários em uma única passada NumPy.
+
+    `params` é um DataFrame (ou dict de arrays) com um cenário por linha; colunas ausentes
+    são lidas de `base`. O cronograma de aportes é compartilhado por todos os cenários.
+    Os resultados são idênticos aos de `calculate_financials` linha a linha.
+    """
+    base = base or {}
+    df = params.reset_index(drop=True) if isinstance(params, pd.DataFrame) else pd.DataFrame(params)
+    n = len(df)
+    if aportes is None:
+        aportes = base.get('aportes', [])
+    key = _schedule_key(aportes)
+
+    def col(k):
+        if k in df.columns: return df[k].to_numpy(dtype=float)
+        return np.full(n, float(base.get(k, 0)))
+
+    if n and ('annual_interest_rate' in df.columns or 'project_end_date' in df.columns):
+        rate_codes, rates = pd.factorize(col('annual_interest_rate'))
+        if 'project_end_date' in df.columns:
+            end_codes, ends = pd.factorize(df['project_end_date'].astype(str), use_na_sentinel=False)
+        else:
+            end_codes, ends = np.zeros(n, dtype=np.int64), [base.get('project_end_date')]
+        pairs, codes = np.unique(rate_codes * len(ends) + end_codes, return_inverse=True)
+        scheds = [_cached_schedule_stage(key, _ensure_date(ends[p % len(ends)]), float(rates[p // len(ends)])) for p in pairs]
+        sched = {k: np.array([s[k] for s in scheds])[codes] for k in scheds[0]}
+    else:
+        # Eixos sem juros/prazo: a parte dos juros vem do cache e é compartilhada por todos os cenários.
+        sched = _cached_schedule_stage(key, _ensure_date(base.get('project_end_date')), float(base.get('annual_interest_rate', 0)))
+
+    out = df.copy()
+    proj = _project_stage(sched, *(col(k) for k in PROJECT_INPUTS))
+    for k in RESULT_COLUMNS:
+        out[k] = np.broadcast_to(sched[k] if k in sched else proj[k], (n,))
+    return out
+
+class ResultCache:
+    """Cache LRU de resultados financeiros, compartilhado por todas as sessões do processo."""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize,
+                    'hit_rate': self.hits / total if total else 0.0}
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
+
+CACHED_RESULT_KEYS = ['start_date', 'project_end_date'] + RESULT_COLUMNS
+
+def financials_key(params):
+    """Hash canônico das entradas que afetam o cálculo (parâmetros numéricos, datas e cronograma)."""
+    canon = {k: float(params.get(k, 0)) for k in PROJECT_INPUTS + ['annual_interest_rate']}
+    canon['start_date'] = _ensure_date(params.get('start_date')).isoformat()
+    canon['project_end_date'] = _ensure_date(params.get('project_end_date')).isoformat()
+    dates, values = _cached_schedule_arrays(_schedule_key(params.get('aportes', [])))
+    canon['aportes'] = [dates.astype(str).tolist(), values.tolist()]
+    return hashlib.sha256(json.dumps(canon, sort_keys=True).encode()).hexdigest()
+
+def calculate_financials_cached(params):
+    """`calculate_financials` com memoização global: relatórios iguais não são recalculados."""
+    cache = get_result_cache()
+    key = financials_key(params)
+    computed = cache.get(key)
+    if computed is None:
+        res = calculate_financials(params)
+        computed = {k: res[k] for k in CACHED_RESULT_KEYS}
+        cache.put(key, computed)
+    results = dict(params)
+    results.update(computed)
+    return results
+
+SENSITIVITY_AXES = {
+    'value_m2': "Valor de Venda (R$/m²)",
+    'construction_cost_m2': "Custo de Obra (R$/m²)",
+    'land_size': "Área Vendável (m²)",
+    'area_exchange_percentage': "Permuta (%)",
+    'spe_percentage': "Part. SPE (%)",
+    'annual_interest_rate': "Juros Anual (%)",
+}
+
+# Rótulos dos eixos do mapa de calor (parâmetros sem formatador usam os ticks padrão do plotly).
+SENSITIVITY_TICK_FORMATS = {
+    'value_m2': (format_brl, 0),
+    'construction_cost_m2': (format_brl, 0),
+    'area_exchange_percentage': (format_percent, 1),
+    'spe_percentage': (format_percent, 1),
+    'annual_interest_rate': (format_percent, 1),
+}
+
+def sensitivity_ticks(key, values, n=6):
+    """(tickvals, ticktext) com `n` marcas ao longo de `values`, ou None para o padrão do plotly."""
+    if key not in SENSITIVITY_TICK_FORMATS or len(values) == 0: return None
+    fmt, decimals = SENSITIVITY_TICK_FORMATS[key]
+    ticks = np.asarray(values)[np.unique(np.linspace(0, len(values) - 1, n).round().astype(int))]
+    return ticks, list(fmt(ticks, decimals))
+
+def sensitivity_surface(results, x_key='value_m2', y_key='construction_cost_m2', resolution=100, span=0.2, metric='roi_anualizado'):
+    """Superfície `resolution` x `resolution` de `metric` variando dois parâmetros em ±`span` do valor base.
+
+    Retorna (valores do eixo x, valores do eixo y, matriz z com uma linha por valor de y).
+    """
+    def axis(k):
+        b = float(results.get(k, 0))
+        return np.linspace(b * (1 - span), b * (1 + span), resolution)
+
+    xs, ys = axis(x_key), axis(y_key)
+    grid_y, grid_x = np.meshgrid(ys, xs, indexing='ij')
+    df = calculate_financials_batch({x_key: grid_x.ravel(), y_key: grid_y.ravel()}, base=results)
+    return xs, ys, df[metric].to_numpy().reshape(grid_x.shape)
+
+@perf.timed("generate_pdf")
 def generate_pdf(data):
     try:
         def to_latin1(text):
@@ -180,12 +552,12 @@ def generate_pdf(data):
             try: return text.encode('latin-1', 'replace').decode('latin-1')
             except: return text
 
+        from fpdf import FPDF  # só na geração do PDF
+        import assets
         pdf = FPDF()
         pdf.add_page()
         
-        if os.path.exists("Lavie.png"):
-            pdf.image("Lavie.png", x=10, y=15, w=35)
-        else:
+        if not assets.add_pdf_logo(pdf, x=10, y=15, w=35):
             pdf.set_font("Arial", "I", 8)
             pdf.cell(0, 5, to_latin1("Simulador Financeiro"), 0, 1, "L")
         
@@ -309,7 +681,7 @@ def generate_pdf(data):
         pdf.set_y(-15)
         pdf.set_font("Arial", "I", 8)
         pdf.set_text_color(128, 128, 128)
-        data_geracao = datetime.now().strftime("%d/%m/%Y às %H:%M")
+        data_geracao = date.today().strftime("%d/%m/%Y")  # só o dia: o PDF fica em cache por dia (`report_key`)
         pdf.cell(0, 10, to_latin1(f"Gerado via Simulador Financeiro Lavie em {data_geracao}"), 0, 0, 'C')
 
         output = pdf.output(dest='S')
@@ -319,3 +691,29 @@ def generate_pdf(data):
     except Exception as e:
         print(f"CRITICAL PDF ERROR: {e}")
         return b""
+
+PDF_REPORT_KEYS = ['client_name', 'client_code', 'total_contribution', 'num_months', 'annual_interest_rate', 'spe_percentage',
+                   'vgv', 'cost_obra_fisica', 'area_exchange_value', 'juros_investidor', 'total_construction_cost',
+                   'final_operational_result', 'valor_corrigido', 'valor_participacao', 'resultado_final_investidor',
+                   'roi', 'roi_anualizado']
+
+@st.cache_resource
+def get_pdf_cache():
+    return ResultCache(maxsize=32)
+
+def report_key(data):
+    """Hash do conteúdo impresso no relatório (e do dia, que aparece no rodapé)."""
+    canon = {k: data.get(k) for k in PDF_REPORT_KEYS}
+    canon['aportes'] = [[str(a.get('date')), float(a.get('value') or 0)] for a in data.get('aportes', [])]
+    canon['gerado_em'] = date.today().isoformat()
+    return hashlib.sha256(json.dumps(canon, sort_keys=True, default=str).encode()).hexdigest()
+
+def generate_pdf_cached(data, cache=None):
+    """`generate_pdf` com cache LRU por conteúdo: baixar de novo o mesmo relatório não refaz o PDF."""
+    cache = get_pdf_cache() if cache is None else cache
+    key = report_key(data)
+    pdf_bytes = cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = generate_pdf(data)
+        if pdf_bytes: cache.put(key, pdf_bytes)
+    return pdf_bytes
@@ -0,0 +1,134 @@
+import time
+import queue
+import atexit
+import threading
+from dataclasses import dataclass, field
+
+PENDING, COMMITTED, FAILED = "pending", "committed", "failed"
+
+MAX_BATCH = 50          # simulações por lote (um append por aba)
+LINGER_SECONDS = 0.5    # espera curta para juntar saves de outras sessões no mesmo lote
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 1.0      # 1, 2, 4, ... segundos
+BACKOFF_MAX = 60.0
+FINISHED_TTL = 3600.0   # segundos que um job concluído (ou com falha) continua consultável
+
+def is_retryable(exc):
+    """Cota (429), erro do servidor (5xx) ou falha de rede valem nova tentativa; o resto falha de vez."""
+    code = getattr(exc, 'code', None)
+    if not isinstance(code, int) or code < 0:  # APIError sem JSON vem com code -1
+        code = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if code is not None:
+        return code == 429 or code >= 500
+    return isinstance(exc, (ConnectionError, TimeoutError, OSError))
+
+@dataclass
+class SaveJob:
+    simulation_id: str
+    row: list
+    aportes: list
+    status: str = PENDING
+    error: str = ""
+    attempts: int = 0
+    queued_at: float = field(default_factory=time.time)
+    finished_at: float = 0.0
+    progress: dict = field(default_factory=dict)  # abas já gravadas, para `retry` não duplicar linhas
+
+class WriteQueue:
+    """Fila de gravação em segundo plano (write-behind), compartilhada por todas as sessões.
+
+    `submit` só enfileira e volta na hora; uma thread junta os saves pendentes em lotes e chama
+    `backend.save_simulations`, com backoff exponencial quando a planilha recusa por cota.
+    O estado de cada simulação (pending/committed/failed) fica disponível em `status` por
+    `FINISHED_TTL` segundos depois de concluída; uma falha pode ser retomada com `retry`.
+    """
+
+    def __init__(self, backend, max_batch=MAX_BATCH, linger=LINGER_SECONDS):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.linger = linger
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._inflight = 0
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush, 10)
+
+    def submit(self, simulation_id, row, aportes):
+        job = SaveJob(simulation_id, row, aportes)
+        with self._lock:
+            self._prune()
+            self._jobs[simulation_id] = job
+            self._inflight += 1
+        self._queue.put(job)
+        return job
+
+    def retry(self, simulation_id):
+        """Reenfileira uma gravação que falhou, com o mesmo id e a partir das abas que já entraram."""
+        with self._lock:
+            job = self._jobs.get(simulation_id)
+            if job is None or job.status != FAILED: return False
+            job.status, job.error, job.finished_at = PENDING, "", 0.0
+            self._inflight += 1
+        self._queue.put(job)
+        return True
+
+    def status(self, simulation_id):
+        job = self._jobs.get(simulation_id)
+        return (job.status, job.error) if job else (None, "")
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {s: sum(j.status == s for j in jobs) for s in (PENDING, COMMITTED, FAILED)}
+
+    def flush(self, timeout=None):
+        """Espera a fila esvaziar; devolve False se o tempo acabar antes."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._inflight == 0, timeout)
+
+    def _prune(self):
+        cutoff = time.time() - FINISHED_TTL
+        for sid in [sid for sid, j in self._jobs.items() if j.status != PENDING and j.finished_at < cutoff]:
+            del self._jobs[sid]
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            try: batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty: break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            retried = [j for j in batch if j.progress]
+            fresh = [j for j in batch if not j.progress]
+            if fresh: self._write(fresh)
+            for job in retried: self._write([job], dict(job.progress))  # nova tentativa: retoma sozinho
+            with self._idle:
+                self._inflight -= len(batch)
+                self._idle.notify_all()
+
+    def _write(self, batch, progress=None):
+        progress = {} if progress is None else progress  # etapas já gravadas: a nova tentativa não duplica linhas
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            for job in batch: job.attempts = attempt
+            try:
+                self.backend.save_simulations([(j.row, j.aportes) for j in batch], progress)
+            except Exception as e:
+                if attempt < MAX_ATTEMPTS and is_retryable(e):
+                    time.sleep(min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+                    continue
+                if len(batch) > 1:
+                    # Um registro ruim não derruba o lote inteiro: regrava um a um, a partir da mesma etapa.
+                    for job in batch: self._write([job], dict(progress))
+                    return
+                job = batch[0]
+                job.status, job.error, job.progress, job.finished_at = FAILED, str(e), progress, time.time()
+                return
+            for job in batch: job.status, job.finished_at = COMMITTED, time.time()
+            return